@@ -1,9 +1,15 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 import os
 import json
+import mmap
+import re
+import threading
 import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime
-from copy import deepcopy
+from typing import Any, Optional
 
 # Optional LLM prompt integration
 try:
@@ -11,7 +17,39 @@ try:
 except Exception:  # pragma: no cover
     Prompt = None  # type: ignore
 
+# Optional fast JSON backend; falls back to stdlib json when unavailable
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+    Serializes straight to UTF-8 bytes, so responses skip the str -> bytes re-encode.
+    """
+
+    _OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+
+    def _dumpb(self, obj, indent: bool = False) -> bytes:
+        option = self._OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self._dumpb(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dumpb(obj, indent=indent) + b"\n", mimetype=self.mimetype)
+
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
@@ -26,17 +64,13 @@ def make_board(rows: int, cols: int) -> dict:
     if rows <= 0 or cols <= 0:
         raise ValueError("rows and cols must be positive integers")
 
-    # Vertical walls: rows x (cols+1)
-    v_walls = [[False] * (cols + 1) for _ in range(rows)]
-    for r in range(rows):
-        v_walls[r][0] = True          # left boundary
-        v_walls[r][cols] = True       # right boundary
+    # Vertical walls: rows x (cols+1), left/right boundary set. Rows are copied from one
+    # template (list copy is a C-level memcpy) instead of patched cell by cell.
+    v_row = [True] + [False] * (cols - 1) + [True]
+    v_walls = [v_row[:] for _ in range(rows)]
 
-    # Horizontal walls: (rows+1) x cols
-    h_walls = [[False] * cols for _ in range(rows + 1)]
-    for c in range(cols):
-        h_walls[0][c] = True          # top boundary
-        h_walls[rows][c] = True       # bottom boundary
+    # Horizontal walls: (rows+1) x cols, top/bottom boundary set
+    h_walls = [[True] * cols] + [[False] * cols for _ in range(rows - 1)] + [[True] * cols]
 
     # Gates default to none (all False). Gates are internal edges only.
     v_gates = [[False] * (cols + 1) for _ in range(rows)]
@@ -62,20 +96,30 @@ def make_board(rows: int, cols: int) -> dict:
 
 
 def ensure_data_dir() -> None:
+    # No "already created" flag: the directories can be removed while the server runs
     os.makedirs(DATA_DIR, exist_ok=True)
     os.makedirs(RUNS_DIR, exist_ok=True)
     os.makedirs(BOARDS_DIR, exist_ok=True)
 
 
-def _zeros(rows: int, cols: int, width_extra: int = 0, height_extra: int = 0):
-    # helper to build False matrices of shapes used by edges
-    # vertical: rows x (cols+1) => width_extra=1
-    # horizontal: (rows+1) x cols => height_extra=1
-    if height_extra:
-        return [[False] * cols for _ in range(rows + height_extra)]
-    if width_extra:
-        return [[False] * (cols + width_extra) for _ in range(rows)]
-    return [[False] * cols for _ in range(rows)]
+def pack_bit_rows(matrix: list, width: int) -> list[int]:
+    """Pack a list[list[bool]] edge matrix into one int per row (bit c <=> cell c).
+    Non-list rows pack to 0; cells beyond `width` are ignored.
+    """
+    out: list[int] = []
+    for row in matrix:
+        bits = 0
+        if isinstance(row, list):
+            for c, v in enumerate(row[:width]):
+                if v:
+                    bits |= 1 << c
+        out.append(bits)
+    return out
+
+
+def unpack_bit_rows(rows_bits: list[int], width: int) -> list[list[bool]]:
+    """Inverse of pack_bit_rows; used at the JSON boundary."""
+    return [[(bits >> c) & 1 == 1 for c in range(width)] for bits in rows_bits]
 
 
 def normalize_board(board: dict) -> dict:
@@ -90,56 +134,23 @@ def normalize_board(board: dict) -> dict:
     if rows <= 0 or cols <= 0:
         raise ValueError("rows and cols must be positive integers")
 
-    base = make_board(rows, cols)
-
-    # Merge walls
-    for r in range(rows):
-        # v_walls
-        src_vw = board.get("v_walls") or []
-        if r < len(src_vw):
-            row = src_vw[r]
-            if isinstance(row, list):
-                for c in range(min(cols + 1, len(row))):
-                    base["v_walls"][r][c] = bool(row[c])
-        # enforce boundary walls
-        base["v_walls"][r][0] = True
-        base["v_walls"][r][cols] = True
-
-    for r in range(rows + 1):
-        src_hw = board.get("h_walls") or []
-        if r < len(src_hw):
-            row = src_hw[r]
-            if isinstance(row, list):
-                for c in range(min(cols, len(row))):
-                    base["h_walls"][r][c] = bool(row[c])
-        # enforce boundary walls
-        if r == 0 or r == rows:
-            for c in range(cols):
-                base["h_walls"][r][c] = True
-
-    # Merge gates; ensure no gates on boundaries
-    src_vg = board.get("v_gates") or []
-    for r in range(rows):
-        if r < len(src_vg) and isinstance(src_vg[r], list):
-            for c in range(min(cols + 1, len(src_vg[r]))):
-                if 0 < c < cols:  # internal only
-                    base["v_gates"][r][c] = bool(src_vg[r][c])
-    src_hg = board.get("h_gates") or []
-    for r in range(1, rows):  # internal rows only
-        if r < len(src_hg) and isinstance(src_hg[r], list):
-            for c in range(min(cols, len(src_hg[r]))):
-                base["h_gates"][r][c] = bool(src_hg[r][c])
-
-    # If an edge is both wall and gate, prefer the explicitly set one based on current content.
-    # For simplicity, if both are True, keep wall and drop gate.
-    for r in range(rows):
-        for c in range(cols + 1):
-            if base["v_walls"][r][c] and base["v_gates"][r][c]:
-                base["v_gates"][r][c] = False
-    for r in range(rows + 1):
-        for c in range(cols):
-            if base["h_walls"][r][c] and base["h_gates"][r][c]:
-                base["h_gates"][r][c] = False
+    # Build every field straight from the input (no make_board() defaults to overwrite).
+    # Work on bit-packed rows (bit c of row r <=> matrix[r][c]) and unpack once at the end
+    def merged(name: str, height: int, width: int) -> list[int]:
+        bits = pack_bit_rows((board.get(name) or [])[:height], width)
+        return bits + [0] * (height - len(bits))
+
+    full = (1 << cols) - 1
+    # enforce boundary walls
+    v_walls = [bits | 1 | (1 << cols) for bits in merged("v_walls", rows, cols + 1)]
+    h_walls = merged("h_walls", rows + 1, cols)
+    h_walls[0] = h_walls[rows] = full
+
+    # Gates are internal edges only. If an edge is both wall and gate, keep wall and drop gate.
+    inner = full & ~1
+    v_gates = [g & inner & ~w for g, w in zip(merged("v_gates", rows, cols + 1), v_walls)]
+    h_gates = [g & ~w for g, w in zip(merged("h_gates", rows + 1, cols), h_walls)]
+    h_gates[0] = h_gates[rows] = 0
 
     def in_bounds(rc):
         return (
@@ -150,55 +161,106 @@ def normalize_board(board: dict) -> dict:
 
     # Entities and tiles
     player = board.get("player", None)
-    base["player"] = list(player) if in_bounds(player) else None
-
     exit_pos = board.get("exit", None)
-    base["exit"] = list(exit_pos) if in_bounds(exit_pos) else None
 
     def normalize_list(name):
-        vals = []
-        for rc in board.get(name, []) or []:
-            if in_bounds(rc):
-                vals.append([int(rc[0]), int(rc[1])])
-        return vals
+        # Single fused comprehension: shape check, unpack, type and range checks
+        return [
+            [int(r), int(c)]
+            for r, c in (rc for rc in board.get(name) or () if isinstance(rc, (list, tuple)) and len(rc) == 2)
+            if isinstance(r, int) and isinstance(c, int) and 0 <= r < rows and 0 <= c < cols
+        ]
+
+    return {
+        "rows": rows,
+        "cols": cols,
+        "v_walls": unpack_bit_rows(v_walls, cols + 1),
+        "h_walls": unpack_bit_rows(h_walls, cols),
+        "v_gates": unpack_bit_rows(v_gates, cols + 1),
+        "h_gates": unpack_bit_rows(h_gates, cols),
+        "player": list(player) if in_bounds(player) else None,
+        "exit": list(exit_pos) if in_bounds(exit_pos) else None,
+        "white_mummies": normalize_list("white_mummies"),
+        "red_mummies": normalize_list("red_mummies"),
+        "traps": normalize_list("traps"),
+        "keys": normalize_list("keys"),
+    }
 
-    base["white_mummies"] = normalize_list("white_mummies")
-    base["red_mummies"] = normalize_list("red_mummies")
-    base["traps"] = normalize_list("traps")
-    base["keys"] = normalize_list("keys")
 
-    return base
+# Files at least this large are parsed straight from an mmap instead of a read() copy
+_MMAP_MIN_BYTES = 1 << 20
 
 
-def ensure_data_dir() -> None:
-    os.makedirs(DATA_DIR, exist_ok=True)
-    os.makedirs(RUNS_DIR, exist_ok=True)
-    os.makedirs(BOARDS_DIR, exist_ok=True)
+def _read_json(path: str):
+    if orjson is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _MMAP_MIN_BYTES:
+            return orjson.loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as buf:
+            return orjson.loads(buf)
+
+
+def _dumpb(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+def _dumpb_line(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(obj).encode('utf-8') + b'\n'
+
+
+def _write_json(path: str, data, indent: bool = True) -> None:
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0))
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2 if indent else None)
+
+
+# (mtime_ns, parsed+normalized data/board.json), reused while the file's mtime is unchanged.
+# Always replaced as a whole so threaded requests never pair one mtime with another board.
+_BOARD_CACHE: Optional[tuple[int, dict]] = None
 
 
 def save_board(board: dict) -> None:
+    global _BOARD_CACHE
     ensure_data_dir()
-    with open(BOARD_PATH, 'w', encoding='utf-8') as f:
-        json.dump(board, f, indent=2)
+    _write_json(BOARD_PATH, board)
+    _BOARD_CACHE = None
 
 
 def load_board() -> dict:
+    """Load data/board.json (normalized). The returned dict is cached and shared; do not mutate it."""
+    global _BOARD_CACHE
     ensure_data_dir()
-    if not os.path.exists(BOARD_PATH):
+    try:
+        mtime = os.stat(BOARD_PATH).st_mtime_ns
+    except FileNotFoundError:
         board = make_board(8, 8)
         save_board(board)
         return board
-    with open(BOARD_PATH, 'r', encoding='utf-8') as f:
-        raw = json.load(f)
-    return normalize_board(raw)
+    cached = _BOARD_CACHE
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    board = normalize_board(_read_json(BOARD_PATH))
+    _BOARD_CACHE = (mtime, board)
+    return board
+
+
+_SAFE_NAME_RE = re.compile(r"[A-Za-z0-9_.-]+")
 
 
 def _is_safe_board_name(name: str) -> bool:
     # Allow only simple names like "foo.json", alnum, dash, underscore, dot
     if not isinstance(name, str) or len(name) == 0 or len(name) > 128:
         return False
-    import re
-    return re.fullmatch(r"[A-Za-z0-9_.-]+", name) is not None and name.lower().endswith('.json')
+    return _SAFE_NAME_RE.fullmatch(name) is not None and name.lower().endswith('.json')
 
 
 def list_boards() -> list[str]:
@@ -235,9 +297,7 @@ def load_board_named(name: str | None) -> tuple[str, dict]:
     path = os.path.join(BOARDS_DIR, name)
     if not os.path.exists(path):
         raise FileNotFoundError('board_not_found')
-    with open(path, 'r', encoding='utf-8') as f:
-        raw = json.load(f)
-    return name, normalize_board(raw)
+    return name, normalize_board(_read_json(path))
 
 
 @app.route('/')
@@ -275,8 +335,7 @@ def api_save_board_named(name: str):
         incoming = request.get_json(force=True)
         board = normalize_board(incoming)
         path = os.path.join(BOARDS_DIR, name)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(board, f, indent=2)
+        _write_json(path, board)
         return jsonify({'status': 'ok', 'name': name}), 200
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 400
@@ -307,8 +366,54 @@ def api_new_board():
 
 
 # ---------------------- LLM Run Orchestration ----------------------
-# Simple in-memory store; also persisted to data/runs/<run_id>.json
-RUNS = {}
+@dataclass
+class Run:
+    """Serializable metadata of one LLM/human run. The live Game lives in RUN_GAMES."""
+    id: str
+    created_at: str
+    model: str
+    temperature: float
+    board_name: str
+    micro: bool
+    last_player_hash: int
+    last_ascii: str
+    log: list = field(default_factory=list)
+    move_count: int = 0
+    repeat_count: int = 0
+    no_change_streak: int = 0
+    ended: bool = False
+    result: Optional[str] = None
+    reason: Optional[str] = None
+
+    def header(self) -> dict:
+        """Snapshot for data/runs/<run_id>.json, minus the log and the board (owned by the Game)."""
+        return {
+            'id': self.id,
+            'created_at': self.created_at,
+            'model': self.model,
+            'temperature': self.temperature,
+            'move_count': self.move_count,
+            'no_change_streak': self.no_change_streak,
+            'ended': self.ended,
+            'result': self.result,
+            'reason': self.reason,
+            'board_name': self.board_name,
+        }
+
+
+# Simple in-memory store; also persisted to data/runs/<run_id>.json (header)
+# and data/runs/<run_id>.log.jsonl (append-only log)
+RUNS: dict[str, Run] = {}
+# Live mummy_env.Game per run id, kept apart so metadata stays small and serializable
+RUN_GAMES: dict[str, Any] = {}
+# Reusable Prompt per run id (created on the first LLM step)
+RUN_LLMS: dict[str, Any] = {}
+# Open append-only file descriptors of data/runs/<run_id>.log.jsonl, least recently used first.
+# Capped so runs abandoned before they end can't leak descriptors; an evicted run's log is
+# simply reopened (O_APPEND) on its next step.
+RUN_LOG_FDS: "OrderedDict[str, int]" = OrderedDict()
+RUN_LOG_FDS_MAX = 32
+_RUN_LOG_LOCK = threading.Lock()
 
 INSTRUCTIONS = (
     "Task: You are an explorer in the game Mummy Maze Deluxe. The objective is to reach the exit without being caught.\n"
@@ -328,23 +433,28 @@ INSTRUCTIONS = (
     "Available actions are: UP, DOWN, LEFT, RIGHT, WAIT, UNDO, RESET.\n"
 )
 
+
+def _state_hash(ascii_state: str) -> int:
+    # SipHash via the builtin; stable within the process, which is all in-memory runs need
+    return hash(ascii_state)
+
+
 ALLOWED_ACTIONS = {"UP", "DOWN", "LEFT", "RIGHT", "WAIT", "UNDO", "RESET"}
+_ACTION_RE = re.compile(r"Action\s*:\s*([A-Za-z]+)")
+# Fallback: first whole-word action anywhere in the reply (single scan)
+_FALLBACK_RE = re.compile(r"\b(UP|DOWN|LEFT|RIGHT|WAIT|UNDO|RESET)\b")
 
 def parse_action_text(text: str) -> str | None:
     if not isinstance(text, str):
         return None
     t = text.strip()
-    import re
-    m = re.search(r"Action\s*:\s*([A-Za-z]+)", t)
+    m = _ACTION_RE.search(t)
     if m:
         cand = m.group(1).strip().upper()
         if cand in ALLOWED_ACTIONS:
             return cand
-    u = t.upper()
-    for a in ["UP","DOWN","LEFT","RIGHT","WAIT","UNDO","RESET"]:
-        if a in u:
-            return a
-    return None
+    m2 = _FALLBACK_RE.search(t.upper())
+    return m2.group(1) if m2 else None
 
 
 @app.post('/api/run/start')
@@ -362,23 +472,16 @@ def api_run_start():
         game = Game(board)
         ascii_state = game.to_text()
         rid = str(uuid.uuid4())
-        run = {
-            'id': rid,
-            'created_at': datetime.utcnow().isoformat() + 'Z',
-            'model': model,
-'temperature': temperature,
-            'board_name': loaded_name,
-            'micro': micro,
-            'game': game,
-'move_count': 0,
-            'repeat_count': 0,
-            'last_player_ascii': ascii_state,
-            'no_change_streak': 0,
-            'last_ascii': ascii_state,
-            'ended': False,
-            'result': None,
-            'reason': None,
-            'log': [
+        run = Run(
+            id=rid,
+            created_at=datetime.utcnow().isoformat() + 'Z',
+            model=model,
+            temperature=temperature,
+            board_name=loaded_name,
+            micro=micro,
+            last_player_hash=_state_hash(ascii_state),
+            last_ascii=ascii_state,
+            log=[
                 {
                     'type': 'system',
                     'content': INSTRUCTIONS,
@@ -387,11 +490,13 @@ def api_run_start():
                     'type': 'state',
                     'ascii': ascii_state,
                 }
-            ]
-        }
+            ],
+        )
         RUNS[rid] = run
+        RUN_GAMES[rid] = game
         # persist initial
         _persist_run(rid)
+        _append_run_log(rid, run.log)
         return jsonify({'run_id': rid, 'ascii': ascii_state, 'board': game.board, 'board_name': loaded_name, 'move_count': 0, 'repeat_count': 0}), 200
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 400
@@ -407,17 +512,16 @@ def api_run_step():
         run = RUNS.get(rid)
         if not run:
             return jsonify({'status': 'error', 'message': 'invalid_run'}), 400
-        if run['ended']:
+        if run.ended:
             return jsonify({'status': 'error', 'message': 'run_ended'}), 400
 
-        game = run['game']
-        ascii_state = game.to_text()
+        game = RUN_GAMES[rid]
         action = None
         prompt_text = None
         llm_reply = None
 
         # Determine micro or turn-based
-        is_micro = bool(run.get('micro', False))
+        is_micro = run.micro
         current_phase = getattr(game, 'phase', 'player') if is_micro else 'turn'
 
         if mode == 'human':
@@ -429,13 +533,15 @@ def api_run_step():
             else:
                 if Prompt is None:
                     return jsonify({'status': 'error', 'message': 'LLM unavailable'}), 500
-                # Build prompt
-                prompt_text = INSTRUCTIONS + "\nCurrent grid (double-resolution):\n\n" + ascii_state + "\n\nRespond ONLY with: Action: <UP|DOWN|LEFT|RIGHT|WAIT|UNDO|RESET>\n"
-                p = Prompt(modelName=run['model'], message=prompt_text, promptStrategy=Prompt.deliverLiteLLMPrompt, temperature=run['temperature'])
-                llm_reply = p.deliver()
+                # Build prompt; last_ascii is the render of the current state, no need to redo it
+                prompt_text = INSTRUCTIONS + "\nCurrent grid (double-resolution):\n\n" + run.last_ascii + "\n\nRespond ONLY with: Action: <UP|DOWN|LEFT|RIGHT|WAIT|UNDO|RESET>\n"
+                llm = RUN_LLMS.get(rid)
+                if llm is None:
+                    llm = RUN_LLMS[rid] = Prompt(modelName=run.model, promptStrategy=Prompt.deliverLiteLLMPrompt, temperature=run.temperature)
+                llm_reply = llm.send(prompt_text)
                 # Print full reply to backend logs
                 try:
-                    print(f"[LLM reply] run={rid} phase={current_phase} model={run['model']} reply={llm_reply!r}")
+                    print(f"[LLM reply] run={rid} phase={current_phase} model={run.model} reply={llm_reply!r}")
                 except Exception:
                     pass
                 parsed = parse_action_text(llm_reply) or 'WAIT'
@@ -448,43 +554,38 @@ def api_run_step():
             res = game.step(action)
 
         new_ascii = res.ascii
-        # Only player's phase increments moves and 3-fold repetition counter
-        if is_micro:
-            if getattr(res, 'phase', '') == 'player':
-                run['move_count'] = run.get('move_count', 0) + 1
-                if new_ascii == run.get('last_player_ascii'):
-                    run['repeat_count'] = run.get('repeat_count', 0) + 1
-                else:
-                    run['repeat_count'] = 0
-                run['last_player_ascii'] = new_ascii
-        else:
-            run['move_count'] = run.get('move_count', 0) + 1
-            if new_ascii == run.get('last_player_ascii'):
-                run['repeat_count'] = run.get('repeat_count', 0) + 1
+        # Only player's phase increments moves and 3-fold repetition counter.
+        # Repetition compares a 64-bit hash of the render rather than the full string.
+        if not is_micro or getattr(res, 'phase', '') == 'player':
+            run.move_count += 1
+            h = _state_hash(new_ascii)
+            if h == run.last_player_hash:
+                run.repeat_count += 1
             else:
-                run['repeat_count'] = 0
-            run['last_player_ascii'] = new_ascii
+                run.repeat_count = 0
+            run.last_player_hash = h
 
         # Maintain last_ascii for display diffs (not used for 3-fold)
-        if new_ascii == run.get('last_ascii'):
-            run['no_change_streak'] = run.get('no_change_streak', 0) + 1
+        if new_ascii == run.last_ascii:
+            run.no_change_streak += 1
         else:
-            run['no_change_streak'] = 0
-        run['last_ascii'] = new_ascii
+            run.no_change_streak = 0
+        run.last_ascii = new_ascii
 
         # Log the exchange
+        entries = []
         if prompt_text is not None:
-            run['log'].append({'type': 'user_prompt', 'content': prompt_text})
+            entries.append({'type': 'user_prompt', 'content': prompt_text})
         if llm_reply is not None:
-            run['log'].append({
+            entries.append({
                 'type': 'assistant',
                 'content': str(llm_reply),
                 'parsed_action': action,
                 'phase': current_phase,
-                'model': run.get('model'),
+                'model': run.model,
                 'time': datetime.utcnow().isoformat() + 'Z',
             })
-        run['log'].append({
+        entries.append({
             'type': 'env',
             'action': res.action,
 'summary': {
@@ -500,22 +601,28 @@ def api_run_step():
             'events': getattr(res, 'events', []),
             'ascii': new_ascii,
         })
+        run.log.extend(entries)
+        _append_run_log(rid, entries)
 
         # Check termination conditions
         if res.done:
-            run['ended'] = True
-            run['result'] = 'win' if res.won else 'lose'
-            run['reason'] = 'goal' if res.won else (res.reason or 'caught')
-        elif run['move_count'] >= 100:
-            run['ended'] = True
-            run['result'] = 'lose'
-            run['reason'] = 'move_cap'
-        elif run.get('repeat_count', 0) >= 3:
-            run['ended'] = True
-            run['result'] = 'lose'
-            run['reason'] = 'threefold'
-
+            run.ended = True
+            run.result = 'win' if res.won else 'lose'
+            run.reason = 'goal' if res.won else (res.reason or 'caught')
+        elif run.move_count >= 100:
+            run.ended = True
+            run.result = 'lose'
+            run.reason = 'move_cap'
+        elif run.repeat_count >= 3:
+            run.ended = True
+            run.result = 'lose'
+            run.reason = 'threefold'
+
+        # The header (move count, board, result) changes every step; it is small, so keep the
+        # on-disk copy current in case the process dies mid-run
         _persist_run(rid)
+        if run.ended:
+            _release_run(rid)
 
         return jsonify({
             'status': 'ok',
@@ -523,11 +630,11 @@ def api_run_step():
             'action': res.action,
             'ascii': new_ascii,
             'board': game.board,
-            'done': run['ended'],
+            'done': run.ended,
             'won': res.won,
-'move_count': run['move_count'],
-            'repeat_count': run.get('repeat_count', 0),
-            'reason': run['reason'] if run['ended'] else None,
+'move_count': run.move_count,
+            'repeat_count': run.repeat_count,
+            'reason': run.reason if run.ended else None,
 'last_reply': (str(llm_reply) if llm_reply is not None else None),
             'phase': getattr(res, 'phase', 'turn'),
             'events': getattr(res, 'events', []),
@@ -542,17 +649,17 @@ def api_run_state():
     run = RUNS.get(rid)
     if not run:
         return jsonify({'status': 'error', 'message': 'invalid_run'}), 400
-    game = run['game']
     return jsonify({
         'run_id': rid,
-        'ascii': game.to_text(),
-        'board': game.board,
-        'board_name': run.get('board_name'),
-        'move_count': run['move_count'],
-        'repeat_count': run.get('repeat_count', 0),
-        'ended': run['ended'],
-        'result': run['result'],
-        'reason': run['reason'],
+        # last_ascii always mirrors the current game state; no need to re-render
+        'ascii': run.last_ascii,
+        'board': RUN_GAMES[rid].board,
+        'board_name': run.board_name,
+        'move_count': run.move_count,
+        'repeat_count': run.repeat_count,
+        'ended': run.ended,
+        'result': run.result,
+        'reason': run.reason,
     })
 
 
@@ -560,15 +667,43 @@ def api_run_state():
 def api_run_replay():
     rid = request.args.get('run_id')
     run = RUNS.get(rid)
-    if not run:
+    if run:
+        # Entries appended after this point belong to the next replay
+        log = run.log
+        entries = (_dumpb(log[i]) for i in range(len(log)))
+    else:
         # try load from file
         path = os.path.join(RUNS_DIR, f'{rid}.json') if rid else None
         if not path or not os.path.exists(path):
             return jsonify({'status': 'error', 'message': 'invalid_run'}), 400
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return jsonify({'run_id': rid, 'log': data.get('log', [])})
-    return jsonify({'run_id': rid, 'log': run['log']})
+        log_path = _run_log_path(rid)
+        if os.path.exists(log_path):
+            entries = _iter_run_log_lines(log_path)
+        else:
+            # Legacy run files embed the full log
+            entries = (_dumpb(e) for e in _read_json(path).get('log', []))
+    return Response(_stream_replay(rid, entries), mimetype='application/json')
+
+
+def _stream_replay(rid: str, entries):
+    """Yield {"run_id": ..., "log": [...]} one encoded log entry at a time."""
+    yield b'{"run_id":' + _dumpb(rid) + b',"log":['
+    first = True
+    for entry in entries:
+        if not first:
+            yield b','
+        first = False
+        yield entry
+    yield b']}\n'
+
+
+def _iter_run_log_lines(path: str):
+    # Lines are already encoded JSON entries; pass them through without re-parsing
+    with open(path, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
 
 
 @app.get('/api/run/list')
@@ -588,40 +723,70 @@ def api_run_stop():
     run = RUNS.get(rid)
     if not run:
         return jsonify({'status': 'error', 'message': 'invalid_run'}), 400
-    run['ended'] = True
-    run['result'] = run['result'] or 'stopped'
-    run['reason'] = run['reason'] or 'stopped'
+    run.ended = True
+    run.result = run.result or 'stopped'
+    run.reason = run.reason or 'stopped'
     _persist_run(rid)
+    _release_run(rid)
     return jsonify({'status': 'ok'})
 
 
+def _run_log_path(rid: str) -> str:
+    return os.path.join(RUNS_DIR, f'{rid}.log.jsonl')
+
+
 def _persist_run(rid: str) -> None:
+    """Write the small run header to data/runs/<run_id>.json.
+    The log itself is appended to data/runs/<run_id>.log.jsonl as it grows.
+    """
     try:
         ensure_data_dir()
         run = RUNS.get(rid)
         if not run:
             return
-        # Prepare serializable snapshot (exclude Game object)
-        data = {
-            'id': run['id'],
-            'created_at': run['created_at'],
-            'model': run['model'],
-            'temperature': run['temperature'],
-            'move_count': run['move_count'],
-            'no_change_streak': run['no_change_streak'],
-            'ended': run['ended'],
-            'result': run['result'],
-            'reason': run['reason'],
-            'log': run['log'],
-            'board_name': run.get('board_name'),
-            'board': run['game'].board,
-        }
         out = os.path.join(RUNS_DIR, f'{rid}.json')
-        with open(out, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        _write_json(out, {**run.header(), 'board': RUN_GAMES[rid].board}, indent=False)
+    except Exception:
+        pass
+
+
+def _append_run_log(rid: str, entries: list) -> None:
+    """Append log entries as JSON lines; cost is O(new entries), not O(log length).
+    The file descriptor stays open while the run is active (see RUN_LOG_FDS and _release_run).
+    """
+    try:
+        data = b''.join(_dumpb_line(e) for e in entries)
+        # Held across the write so an eviction can't close (and the OS reuse) a descriptor in use
+        with _RUN_LOG_LOCK:
+            fd = RUN_LOG_FDS.get(rid)
+            if fd is None:
+                ensure_data_dir()
+                flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0)
+                fd = RUN_LOG_FDS[rid] = os.open(_run_log_path(rid), flags, 0o644)
+                while len(RUN_LOG_FDS) > RUN_LOG_FDS_MAX:
+                    _, idle = RUN_LOG_FDS.popitem(last=False)
+                    _close_fd(idle)
+            else:
+                RUN_LOG_FDS.move_to_end(rid)
+            os.write(fd, data)
     except Exception:
         pass
 
 
+def _close_fd(fd: int) -> None:
+    try:
+        os.close(fd)
+    except OSError:
+        pass
+
+
+def _release_run(rid: str) -> None:
+    """Drop per-run resources once a run has ended or been stopped."""
+    RUN_LLMS.pop(rid, None)
+    with _RUN_LOG_LOCK:
+        fd = RUN_LOG_FDS.pop(rid, None)
+    if fd is not None:
+        _close_fd(fd)
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -42,6 +42,7 @@ Usage example:
         modelName="microsoft/Phi-3.5-mini-instruct",
         message="Write a limerick",
         promptStrategy=Prompt.deliverTransformersTokenizerPrompt,
+        quantization="int4",  # optional: "int8" / "int4" via bitsandbytes
     )
     print(p.deliver())
 
@@ -55,45 +56,50 @@ Usage example:
         promptStrategy=Prompt.deliverPromptInstructor,
     )
     print(p.deliver(structuredOutputClass=MyOut))
+
+    # Many prompts at once (API / LiteLLM requests overlap instead of running serially):
+    import asyncio
+    prompts = [Prompt(modelName="gpt-4o-mini", message=m, promptStrategy=Prompt.deliverAPIPrompt)
+               for m in ("one", "two", "three")]
+    print(asyncio.run(Prompt.deliver_batch(prompts, concurrency=8)))
 """
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Callable, Optional, Tuple
-
-# Optional deps
-try:
-    import instructor  # type: ignore
-except Exception:  # pragma: no cover
-    instructor = None  # type: ignore
+import asyncio
+import contextlib
+import copy
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import logging
+import os
+import threading
+import types
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
 
-try:
-    import ollama  # type: ignore
-except Exception:  # pragma: no cover
-    ollama = None  # type: ignore
 
-try:
-    from openai import OpenAI  # type: ignore
-except Exception:  # pragma: no cover
-    OpenAI = None  # type: ignore
+# Optional deps are imported on first use rather than at module import, so scripts that
+# only need one backend don't pay for loading torch/transformers/litellm/openai.
+@functools.cache
+def _optional(modname: str, attr: Optional[str] = None) -> Any:
+    """Import `modname` (and return `attr` from it, if given); None when unavailable."""
+    try:
+        module = importlib.import_module(modname)
+        return getattr(module, attr) if attr else module
+    except Exception:
+        return None
 
-# liteLLM (optional)
-try:
-    from litellm import completion as litellm_completion  # type: ignore
-except Exception:  # pragma: no cover
-    litellm_completion = None  # type: ignore
 
-try:
-    from transformers import AutoModelForCausalLM, AutoTokenizer  # type: ignore
-except Exception:  # pragma: no cover
-    AutoModelForCausalLM = None  # type: ignore
-    AutoTokenizer = None  # type: ignore
+# Weight quantization modes accepted by Prompt(quantization=...) for local transformers models
+QUANTIZATION_MODES = ("int8", "int4")
 
-try:
-    from icecream import ic  # type: ignore
-except Exception:  # pragma: no cover
-    def ic(*args, **kwargs):  # fallback no-op
-        return None
+_logger = logging.getLogger(__name__)
 
 # Config fallback
 try:
@@ -107,32 +113,401 @@ except Exception:  # pragma: no cover
     }
 
 
+# Tokenizers' Rust thread pool misbehaves (and warns) after fork in multi-process eval harnesses
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes")
+
+
+# Opt-in: torch.compile the loaded model and decode with a static KV cache.
+# Off by default since compilation is slow to warm up and regresses on some setups.
+_TORCH_COMPILE = _env_flag("LLM_PROMPT_TORCH_COMPILE")
+
+# Opt-in: load unquantized models in bfloat16 instead of the checkpoint's default dtype.
+# Off by default since it changes numerics, and CPUs without native bf16 run it slower.
+_BF16_WEIGHTS = _env_flag("LLM_PROMPT_BF16")
+
+# Opt-in: run CPU-resident models through Intel Extension for PyTorch, when it is installed
+_USE_IPEX = _env_flag("LLM_PROMPT_IPEX")
+
+
 @dataclass
 class _TransformersCache:
-    model: Any = None
-    tokenizer: Any = None
-    model_name: Optional[str] = None
+    """Process-wide (model, tokenizer) cache, keyed by (model name, quantization) and bounded LRU-style."""
+    max_models: int = 2
+    models: "OrderedDict[Tuple[str, Optional[str]], Tuple[Any, Any]]" = field(default_factory=OrderedDict)
+    compiled: set = field(default_factory=set)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
-    def get_or_create(self, model_name: str) -> Tuple[Any, Any]:
-        if AutoModelForCausalLM is None or AutoTokenizer is None:
+    def get_or_create(self, model_name: str, quantization: Optional[str] = None) -> Tuple[Any, Any]:
+        if _optional("transformers") is None:
             raise RuntimeError("transformers not installed")
-        if self.model is None or self.model_name != model_name:
-            # Load once; rely on accelerate for device placement
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_name, device_map="auto"
-            )
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model_name = model_name
-        return self.model, self.tokenizer
+        key = (model_name, quantization)
+        entry = self.models.get(key)
+        if entry is None:
+            with self._lock:
+                # Re-check under the lock so concurrent callers don't load the same weights twice
+                entry = self.models.get(key)
+                if entry is None:
+                    entry = self._load(model_name, quantization)
+                    self.models[key] = entry
+                    self._evict()
+        with self._lock:
+            if key in self.models:
+                self.models.move_to_end(key)
+        return entry
+
+    def is_compiled(self, model_name: str, quantization: Optional[str] = None) -> bool:
+        return (model_name, quantization) in self.compiled
+
+    def _load(self, model_name: str, quantization: Optional[str]) -> Tuple[Any, Any]:
+        kwargs: dict[str, Any] = {"device_map": "auto", "low_cpu_mem_usage": True}
+        torch = _optional("torch")
+        try:
+            bf16 = torch is not None and torch.cuda.is_available() and torch.cuda.is_bf16_supported()
+        except Exception:
+            bf16 = False
+        if quantization is not None:
+            BitsAndBytesConfig = _optional("transformers", "BitsAndBytesConfig")
+            if BitsAndBytesConfig is None or torch is None:
+                raise RuntimeError("quantization requires torch and bitsandbytes-enabled transformers")
+            if quantization == "int4":
+                kwargs["quantization_config"] = BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_compute_dtype=torch.bfloat16 if bf16 else torch.float16,
+                    bnb_4bit_quant_type="nf4",
+                )
+            else:
+                kwargs["quantization_config"] = BitsAndBytesConfig(load_in_8bit=True)
+        elif _BF16_WEIGHTS and torch is not None:
+            kwargs["torch_dtype"] = torch.bfloat16
+        # Load once; rely on accelerate for device placement
+        model = _optional("transformers", "AutoModelForCausalLM").from_pretrained(model_name, **kwargs)
+        model = _ipex_optimize(model)
+        tokenizer = _optional("transformers", "AutoTokenizer").from_pretrained(model_name, use_fast=True)
+        if _TORCH_COMPILE and _compile(model, tokenizer):
+            self.compiled.add((model_name, quantization))
+        return model, tokenizer
+
+    def _evict(self) -> None:
+        evicted = False
+        while len(self.models) > max(1, self.max_models):
+            name, (model, tokenizer) = self.models.popitem(last=False)
+            self.compiled.discard(name)
+            del model, tokenizer
+            evicted = True
+        if evicted:
+            try:
+                torch = _optional("torch")
+                if torch is not None and torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except Exception:
+                pass
+
+
+def _set_torch_threads(n: int) -> None:
+    """Cap intra-op CPU threads; avoids oversubscription when several eval workers share a machine."""
+    torch = _optional("torch")
+    if torch is not None and torch.get_num_threads() != n:
+        torch.set_num_threads(n)
+
+
+def _ipex_optimize(model: Any) -> Any:
+    """Apply Intel Extension for PyTorch to CPU-resident models when LLM_PROMPT_IPEX is set."""
+    if not _USE_IPEX:
+        return model
+    ipex = _optional("intel_extension_for_pytorch")
+    device = _model_device(model)
+    if ipex is None or device is None or getattr(device, "type", None) != "cpu":
+        return model
+    try:
+        # Keep the model's dtype unless bf16 weights were requested too
+        dtype = _optional("torch").bfloat16 if _BF16_WEIGHTS else None
+        return ipex.optimize(model.eval(), dtype=dtype)
+    except Exception:
+        _logger.debug("ipex.optimize failed; using the unoptimized model", exc_info=True)
+        return model
+
+
+def _compile(model: Any, tokenizer: Any) -> bool:
+    eager_forward = model.forward
+    try:
+        model.forward = _optional("torch").compile(model.forward, mode="reduce-overhead", fullgraph=False)
+        # Warm up once so the first real prompt doesn't pay for compilation
+        warm = tokenizer(["warmup"], return_tensors="pt").to(model.device)
+        model.generate(**warm, **_static_generate_kwargs(tokenizer), max_new_tokens=2, do_sample=False)
+        return True
+    except Exception:
+        model.forward = eager_forward
+        return False
+
+
+def _model_device(model: Any) -> Any:
+    try:
+        return next(model.parameters()).device
+    except Exception:
+        return getattr(model, "device", None)
+
+
+def _pad_token_id(tokenizer: Any) -> Any:
+    pad = getattr(tokenizer, "pad_token_id", None)
+    if pad is None:
+        pad = getattr(tokenizer, "eos_token_id", None)
+    return pad
+
+
+def _keep_last_tokens(encoded: Any, n: int) -> dict[str, Any]:
+    """Left-truncate tokenized inputs to their last n tokens (without touching the shared tokenizer's truncation_side)."""
+    return {k: v[:, -n:] for k, v in encoded.items()}
+
+
+def _left_pad(rows: list[list[int]], pad_id: Any) -> dict[str, Any]:
+    """Batch token id lists into left-padded input_ids/attention_mask tensors.
+
+    Decoder-only models must be left-padded so every row continues from its last real token.
+    """
+    torch = _optional("torch")
+    width = max((len(ids) for ids in rows), default=0)
+    pad = 0 if pad_id is None else pad_id
+    input_ids = [[pad] * (width - len(ids)) + list(ids) for ids in rows]
+    attention_mask = [[0] * (width - len(ids)) + [1] * len(ids) for ids in rows]
+    return {"input_ids": torch.tensor(input_ids), "attention_mask": torch.tensor(attention_mask)}
+
+
+def _static_generate_kwargs(tokenizer: Any) -> dict[str, Any]:
+    return {"cache_implementation": "static", "pad_token_id": _pad_token_id(tokenizer)}
 
 
 _TRANSFORMERS_CACHE = _TransformersCache()
 
+# Sync OpenAI SDK clients keyed by (kind, base_url, api_key). Reusing a client keeps its
+# httpx connection pool alive, so repeat calls skip the TCP+TLS handshake.
+_CLIENT_CACHE: dict[tuple, Any] = {}
+_CLIENT_LOCK = threading.Lock()
+
+
+def _cached_client(key: tuple, factory: Callable[[], Any]) -> Any:
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        with _CLIENT_LOCK:
+            client = _CLIENT_CACHE.get(key)
+            if client is None:
+                client = _CLIENT_CACHE[key] = factory()
+    return client
+
+
+def _batch_client(clients: dict[tuple, Any], key: tuple, factory: Callable[[], Any]) -> Any:
+    """Per-batch counterpart of _cached_client for async clients.
+
+    Async clients bind their connection pool to the running event loop, so they must not outlive
+    the deliver_batch() call that created them.
+    """
+    client = clients.get(key)
+    if client is None:
+        client = clients[key] = factory()
+    return client
+
+
+async def _aclose_clients(clients: dict[tuple, Any]) -> None:
+    for client in clients.values():
+        close = getattr(client, "close", None) or getattr(client, "aclose", None)
+        if close is None:
+            # Older ollama AsyncClients only expose the wrapped httpx.AsyncClient
+            close = getattr(getattr(client, "_client", None), "aclose", None)
+        if close is None:
+            continue
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            _logger.debug("could not close async client %r", client, exc_info=True)
+    clients.clear()
+
+
+def _http_client_kwargs(async_: bool = False) -> dict[str, Any]:
+    httpx = _optional("httpx")
+    if httpx is None:
+        return {}
+    limits = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+    cls = httpx.AsyncClient if async_ else httpx.Client
+    # Only the pool size is tuned: with httpx's default timeout on the client, the SDK keeps
+    # applying its own (much longer) request timeout
+    return {"http_client": cls(limits=limits)}
+
+
+# Rendered chat templates per tokenizer instance: an LRU of key -> text for each tokenizer. Weak
+# keys let a tokenizer evicted from _TRANSFORMERS_CACHE be freed along with its entries.
+_RENDERED: "weakref.WeakKeyDictionary[Any, OrderedDict[tuple, Optional[str]]]" = weakref.WeakKeyDictionary()
+_RENDERED_MAX = 512
+_RENDERED_LOCK = threading.Lock()
+
+
+def _memo_render(tokenizer: Any, key: tuple, render: Callable[[], Optional[str]]) -> Optional[str]:
+    try:
+        with _RENDERED_LOCK:
+            cache = _RENDERED.get(tokenizer)
+            if cache is None:
+                cache = _RENDERED[tokenizer] = OrderedDict()
+            elif key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+    except TypeError:
+        # Not weak-referenceable or not hashable: render without memoizing
+        return render()
+    text = render()
+    with _RENDERED_LOCK:
+        cache[key] = text
+        while len(cache) > _RENDERED_MAX:
+            cache.popitem(last=False)
+    return text
+
+
+def _render_template(tokenizer: Any, content: str, system: Optional[str] = None) -> str:
+    if system:
+        try:
+            return tokenizer.apply_chat_template(
+                [{"role": "system", "content": system}, {"role": "user", "content": content}],
+                tokenize=False, add_generation_prompt=True,
+            )
+        except Exception:
+            # Some chat templates (Gemma, Mistral-style) reject the system role: fold it into the user turn
+            content = f"{system}\n\n{content}"
+    try:
+        # Not all tokenizers implement this; fallback to raw
+        return tokenizer.apply_chat_template(
+            [{"role": "user", "content": content}], tokenize=False, add_generation_prompt=True
+        )
+    except Exception:
+        return content
+
+
+def _render_prefix(tokenizer: Any, system: str) -> Optional[str]:
+    try:
+        return tokenizer.apply_chat_template(
+            [{"role": "system", "content": system}], tokenize=False, add_generation_prompt=False
+        )
+    except Exception:
+        return None
+
+
+@dataclass
+class _PrefixKV:
+    """KV cache of one shared prompt prefix, plus the lock held while a generate() uses it."""
+    ids: Optional[list] = None
+    past: Any = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+# KV caches for shared prompt prefixes (the rendered system prompt), keyed by
+# (model name, quantization, prefix text).
+_PREFIX_KV: "OrderedDict[tuple, _PrefixKV]" = OrderedDict()
+_PREFIX_KV_MAX = 8
+_PREFIX_KV_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def _prefix_kv(model: Any, tok: Any, key: tuple, prefix_text: str, input_ids: Any) -> Iterator[Any]:
+    """Yield the prefix's KV cache if `input_ids` starts with that prefix, else None.
+
+    generate() extends the cache in place, so the entry stays locked while the caller generates
+    and is then cropped back to the prefix; no per-call copy of the K/V tensors is made.
+    """
+    torch = _optional("torch")
+    if torch is None:
+        yield None
+        return
+    with _PREFIX_KV_LOCK:
+        entry = _PREFIX_KV.get(key)
+        if entry is None:
+            entry = _PREFIX_KV[key] = _PrefixKV()
+            while len(_PREFIX_KV) > _PREFIX_KV_MAX:
+                _PREFIX_KV.popitem(last=False)
+        else:
+            _PREFIX_KV.move_to_end(key)
+    with entry.lock:
+        if entry.ids is None:
+            # Computed once per prefix: concurrent callers wait on the entry lock for it
+            prefix_ids = tok([prefix_text], return_tensors="pt")["input_ids"]
+            device = _model_device(model)
+            if device is not None:
+                prefix_ids = prefix_ids.to(device)
+            with torch.no_grad():
+                past = model(input_ids=prefix_ids, use_cache=True).past_key_values
+            # Legacy tuple caches are never mutated; other caches must be croppable to be reused
+            reusable = isinstance(past, tuple) or callable(getattr(past, "crop", None))
+            entry.ids, entry.past = (prefix_ids[0].tolist(), past) if reusable else ([], None)
+        n = len(entry.ids)
+        # Tokenization must agree on the prefix, and at least one new token must remain to prefill
+        if not 0 < n < input_ids.shape[-1] or input_ids[0, :n].tolist() != entry.ids:
+            yield None
+            return
+        try:
+            yield entry.past
+        finally:
+            crop = getattr(entry.past, "crop", None)
+            if crop is not None:
+                crop(n)
+
+
+# Models served by OpenAI itself: no custom base_url/api_key, the SDK's env-var defaults apply
+_OPENAI_NATIVE_MODELS = frozenset({"gpt-4o", "gpt-4o-mini"})
+
+
+def _cache_path(key: str) -> Path:
+    return Path(os.environ.get("LLM_PROMPT_CACHE", "./.llm_cache")) / key
+
+
+def _cache_read(key: str) -> Optional[str]:
+    try:
+        return _cache_path(key).read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def _cache_write(key: str, text: str) -> None:
+    path = _cache_path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent readers never see a partial entry
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        _logger.debug("could not write response cache entry %s", path, exc_info=True)
+
+
 # A PromptStrategy is an instance method (bound) that returns a string or structured output
 PromptStrategy = Callable[["Prompt"], Any]
 
 
 class Prompt:
+    __slots__ = (
+        "modelName",
+        "messageContent",
+        "isInstructor",
+        "temperature",
+        "systemPrompt",
+        "max_new_tokens",
+        "top_p",
+        "seed",
+        "promptStrategy",
+        "baseurl",
+        "apiKey",
+        "max_input_tokens",
+        "quantization",
+        "stream",
+        "stop_on",
+        "enable_cache",
+        "num_threads",
+        "_explicit_sampling",
+        "_rendered_prompt",
+        "_model_inputs",
+        "_messages",
+    )
+
     def __init__(
         self,
         modelName: str,
@@ -140,64 +515,205 @@ class Prompt:
         promptTemplate: str = CONFIG.get("prompt_template", ""),
         isInstructor: bool = False,
         promptStrategy: Optional[PromptStrategy] = None,
-        temperature: float = 0.3,
+        temperature: Optional[float] = None,
         systemPrompt: Optional[str] = None,
-        max_new_tokens: int = 1024,
-        top_p: float = 0.95,
+        max_new_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
         seed: Optional[int] = None,
+        max_input_tokens: Optional[int] = None,
+        quantization: Optional[str] = None,
+        stream: bool = False,
+        stop_on: Optional[Callable[[str], bool]] = None,
+        enable_cache: bool = False,
+        num_threads: Optional[int] = None,
     ) -> None:
         self.modelName = modelName
         self.messageContent = message if message is not None else promptTemplate
         self.isInstructor = isInstructor
-        self.temperature = float(temperature)
+        # Sampling settings the caller passed; backends that otherwise apply the model's own
+        # defaults (ollama) are sent only these
+        self._explicit_sampling = frozenset(
+            name for name, value in (("temperature", temperature), ("max_new_tokens", max_new_tokens), ("top_p", top_p))
+            if value is not None
+        )
+        self.temperature = float(temperature) if temperature is not None else 0.3
         self.systemPrompt = systemPrompt
-        self.max_new_tokens = int(max_new_tokens)
-        self.top_p = float(top_p)
+        self.max_new_tokens = int(max_new_tokens) if max_new_tokens is not None else 1024
+        self.top_p = float(top_p) if top_p is not None else 0.95
         self.seed = seed
+        # Prompt token cap for local transformers models (None: no truncation). Longer prompts
+        # lose their oldest tokens, so the chat template's generation prompt is always kept
+        self.max_input_tokens = int(max_input_tokens) if max_input_tokens is not None else None
+        if quantization is not None and quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"quantization must be one of {QUANTIZATION_MODES} or None")
+        self.quantization = quantization
+        # Stream API/LiteLLM/Ollama completions; stop_on(text_so_far) -> True ends generation early
+        self.stream = bool(stream)
+        self.stop_on = stop_on
+        # Reuse text responses from the on-disk cache (LLM_PROMPT_CACHE, default ./.llm_cache)
+        self.enable_cache = bool(enable_cache)
+        # CPU threads for local transformers inference (None: torch's default of one per core)
+        self.num_threads = int(num_threads) if num_threads is not None else None
 
         # Strategy: bind caller-provided strategy to this instance, or default to Ollama
         if promptStrategy is None:
             self.promptStrategy: PromptStrategy = self.deliverOllamaPrompt
+        elif isinstance(promptStrategy, types.FunctionType):
+            # Bind unbound function (e.g., Prompt.deliverAPIPrompt) to this instance
+            self.promptStrategy = types.MethodType(promptStrategy, self)
         else:
-            try:
-                # Bind unbound function (e.g., Prompt.deliverAPIPrompt) to this instance
-                self.promptStrategy = promptStrategy.__get__(self, Prompt)  # type: ignore[attr-defined]
-            except Exception:
-                # Fallback: assume already bound/callable
-                self.promptStrategy = promptStrategy  # type: ignore[assignment]
+            # Already bound method or other callable
+            self.promptStrategy = promptStrategy  # type: ignore[assignment]
+        if not callable(self.promptStrategy):
+            raise TypeError("promptStrategy must be callable")
 
         self.baseurl, self.apiKey = self._getBaseUrlAndKey()
-        self._transformerModel = None
-        self._tokenizer = None
+        # ((content, systemPrompt), rendered chat template) for the last transformers delivery
+        self._rendered_prompt: Optional[Tuple[Tuple[str, Optional[str]], str]] = None
+        # ((modelName, rendered text), device-resident tokenized inputs)
+        self._model_inputs: Optional[Tuple[Tuple[str, str], dict[str, Any]]] = None
+        # ((messageContent, systemPrompt), messages) from the last _build_messages()
+        self._messages: Optional[Tuple[Tuple[Optional[str], Optional[str]], list[dict[str, str]]]] = None
 
     def deliver(self, **kwargs) -> Any:
-        return self.promptStrategy(**kwargs) if hasattr(self.promptStrategy, "__call__") else None
+        key = self._cache_key() if not kwargs else None
+        if key is None:
+            return self.promptStrategy(**kwargs)
+        hit = _cache_read(key)
+        if hit is not None:
+            return hit
+        out = self.promptStrategy()
+        if isinstance(out, str):
+            _cache_write(key, out)
+        return out
+
+    @classmethod
+    async def deliver_batch(cls, prompts: Iterable["Prompt"], concurrency: int = 32) -> list[Any]:
+        """Deliver many prompts concurrently; results come back in input order.
+        API, LiteLLM and Ollama strategies are awaited natively; any other strategy runs in a worker thread.
+        Usage:
+            results = asyncio.run(Prompt.deliver_batch(prompts))
+        """
+        sem = asyncio.Semaphore(max(1, int(concurrency)))
+        # Async clients for this batch only; they are closed before the event loop goes away
+        clients: dict[tuple, Any] = {}
+
+        async def one(p: "Prompt") -> Any:
+            async with sem:
+                return await p._deliverAsync(clients)
+
+        try:
+            return await asyncio.gather(*(one(p) for p in prompts))
+        finally:
+            await _aclose_clients(clients)
+
+    async def _deliverAsync(self, clients: dict[tuple, Any]) -> Any:
+        key = self._cache_key()
+        if key is not None:
+            hit = _cache_read(key)
+            if hit is not None:
+                return hit
+        strategy = getattr(self.promptStrategy, "__func__", None)
+        if self.stream or self.stop_on is not None:
+            # The native async paths don't stream; run the sync strategy so stop_on ends
+            # generation exactly as deliver() would
+            out = await asyncio.to_thread(self.promptStrategy)
+        elif strategy is Prompt.deliverAPIPrompt:
+            out = await self._deliverAPIPromptAsync(clients)
+        elif strategy is Prompt.deliverLiteLLMPrompt:
+            out = await self._deliverLiteLLMPromptAsync()
+        elif strategy is Prompt.deliverOllamaPrompt:
+            out = await self._deliverOllamaPromptAsync(clients)
+        else:
+            out = await asyncio.to_thread(self.promptStrategy)
+        if key is not None and isinstance(out, str):
+            _cache_write(key, out)
+        return out
+
+    def _cache_key(self) -> Optional[str]:
+        """Content hash of everything that determines the response; None when caching doesn't apply."""
+        # stop_on truncates output by an arbitrary callable, so those responses aren't reusable
+        if not self.enable_cache or self.stop_on is not None:
+            return None
+        strategy = getattr(self.promptStrategy, "__func__", self.promptStrategy)
+        payload = json.dumps({
+            "strategy": getattr(strategy, "__qualname__", repr(strategy)),
+            "m": self.modelName,
+            # The same model name on another server is a different model
+            "u": self.baseurl,
+            "h": CONFIG.get("default_ollama_server"),
+            "q": self.quantization,
+            "msg": self._build_messages(),
+            "t": self.temperature,
+            "p": self.top_p,
+            "n": self.max_new_tokens,
+            "s": self.seed,
+            # Ollama only sends explicitly set sampling options, so defaults and explicit values differ
+            "x": sorted(self._explicit_sampling),
+        }, sort_keys=True)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+    def with_message(self, message: str) -> "Prompt":
+        """Return a copy of this Prompt carrying `message`; the original (and its caches) is untouched."""
+        clone = copy.copy(self)
+        clone.messageContent = message
+        clone._rendered_prompt = None
+        clone._model_inputs = None
+        clone._messages = None
+        # Re-bind a bound-method strategy to the clone so it reads the clone's message
+        func = getattr(self.promptStrategy, "__func__", None)
+        if func is not None and getattr(self.promptStrategy, "__self__", None) is self:
+            clone.promptStrategy = types.MethodType(func, clone)
+        return clone
+
+    def send(self, message: str, **kwargs) -> Any:
+        """Deliver a new user message, reusing this Prompt's model/strategy configuration.
+        Lets callers keep one Prompt per conversation instead of constructing one per turn.
+        """
+        self.messageContent = message
+        return self.deliver(**kwargs)
 
     # ----- Common helpers -----
     def _getBaseUrlAndKey(self) -> Tuple[Optional[str], Optional[str]]:
         # For OpenAI-native models, let the OpenAI SDK defaults apply (env vars)
-        if self.modelName in {"gpt-4o", "gpt-4o-mini"}:
+        if self.modelName in _OPENAI_NATIVE_MODELS:
             return None, None
         return CONFIG.get("baseurl", None), CONFIG.get("api_key", None)
 
     def _setupClient(self):
         if self.isInstructor:
             return self._setupInstructorClient()
+        OpenAI = _optional("openai", "OpenAI")
         if OpenAI is None:
             raise RuntimeError("openai SDK not installed")
-        return OpenAI(base_url=self.baseurl, api_key=self.apiKey)
+        return _cached_client(
+            ("openai", self.baseurl, self.apiKey),
+            lambda: OpenAI(base_url=self.baseurl, api_key=self.apiKey, **_http_client_kwargs()),
+        )
+
+    def _setupAsyncClient(self, clients: dict[tuple, Any]):
+        AsyncOpenAI = _optional("openai", "AsyncOpenAI")
+        if AsyncOpenAI is None:
+            raise RuntimeError("openai SDK not installed")
+        return _batch_client(
+            clients,
+            ("async_openai", self.baseurl, self.apiKey),
+            lambda: AsyncOpenAI(base_url=self.baseurl, api_key=self.apiKey, **_http_client_kwargs(async_=True)),
+        )
 
     def _setupInstructorClient(self):
+        instructor = _optional("instructor")
+        OpenAI = _optional("openai", "OpenAI")
         if instructor is None or OpenAI is None:
             raise RuntimeError("instructor or openai not installed")
-        client = instructor.from_openai(
-            OpenAI(
-                base_url=CONFIG.get("default_ollama_server", "http://localhost:11434"),
-                api_key="ollama",
+        base_url = CONFIG.get("default_ollama_server", "http://localhost:11434")
+        return _cached_client(
+            ("instructor", base_url, "ollama"),
+            lambda: instructor.from_openai(
+                OpenAI(base_url=base_url, api_key="ollama", **_http_client_kwargs()),
+                mode=instructor.Mode.JSON,
             ),
-            mode=instructor.Mode.JSON,
         )
-        return client
 
     # ----- Strategies -----
     def deliverPromptInstructor(self, structuredOutputClass: Any) -> Any:
@@ -216,51 +732,204 @@ class Prompt:
         if not self.messageContent:
             return ""
         messages = self._build_messages()
-        ic({"model": self.modelName, "len": len(self.messageContent)})
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("model=%s len=%d", self.modelName, len(self.messageContent))
+        if self.stream:
+            chunks = client.chat.completions.create(
+                model=self.modelName,
+                messages=messages,
+                temperature=self.temperature,
+                stream=True,
+                **self._api_sampling_kwargs(),
+            )
+            return self._collect_stream(chunks, self._delta_text)
         resp = client.chat.completions.create(
             model=self.modelName,
             messages=messages,
             temperature=self.temperature,
+            **self._api_sampling_kwargs(),
+        )
+        if resp is None or not getattr(resp, "choices", None):
+            return ""
+        return resp.choices[0].message.content
+
+    async def _deliverAPIPromptAsync(self, clients: dict[tuple, Any]) -> str:
+        client = self._setupAsyncClient(clients)
+        if not self.messageContent:
+            return ""
+        messages = self._build_messages()
+        resp = await client.chat.completions.create(
+            model=self.modelName,
+            messages=messages,
+            temperature=self.temperature,
+            **self._api_sampling_kwargs(),
         )
         if resp is None or not getattr(resp, "choices", None):
             return ""
         return resp.choices[0].message.content
 
+    def _api_sampling_kwargs(self) -> dict[str, Any]:
+        # Like _ollama_options: only limits the caller set, so the server's defaults otherwise apply
+        kwargs: dict[str, Any] = {}
+        if "max_new_tokens" in self._explicit_sampling:
+            kwargs["max_tokens"] = self.max_new_tokens
+        if "top_p" in self._explicit_sampling:
+            kwargs["top_p"] = self.top_p
+        return kwargs
+
     def deliverOllamaPrompt(self) -> str:
+        ollama = _optional("ollama")
         if ollama is None:
             raise RuntimeError("ollama library not installed")
         if not self.messageContent:
             return ""
-        ic({"model": self.modelName, "len": len(self.messageContent)})
-        out = ollama.generate(model=self.modelName, prompt=self.messageContent)
-        return out.get("response", "") if isinstance(out, dict) else str(out)
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("model=%s len=%d", self.modelName, len(self.messageContent))
+        host = CONFIG.get("default_ollama_server", "http://localhost:11434")
+        client = _cached_client(("ollama", host), lambda: ollama.Client(host=host))
+        if self.stream:
+            parts = client.generate(model=self.modelName, prompt=self.messageContent,
+                                    options=self._ollama_options(), stream=True)
+            return self._collect_stream(parts, self._ollama_text)
+        out = client.generate(model=self.modelName, prompt=self.messageContent, options=self._ollama_options())
+        return self._ollama_text(out)
+
+    async def _deliverOllamaPromptAsync(self, clients: dict[tuple, Any]) -> str:
+        ollama = _optional("ollama")
+        if ollama is None:
+            raise RuntimeError("ollama library not installed")
+        if not self.messageContent:
+            return ""
+        host = CONFIG.get("default_ollama_server", "http://localhost:11434")
+        client = _batch_client(clients, ("ollama_async", host), lambda: ollama.AsyncClient(host=host))
+        out = await client.generate(model=self.modelName, prompt=self.messageContent, options=self._ollama_options())
+        return self._ollama_text(out)
+
+    def _ollama_options(self) -> Optional[dict[str, Any]]:
+        # Only settings the caller chose; anything else keeps the model's server-side default
+        explicit = self._explicit_sampling
+        options: dict[str, Any] = {}
+        if "temperature" in explicit:
+            options["temperature"] = self.temperature
+        if "top_p" in explicit:
+            options["top_p"] = self.top_p
+        if "max_new_tokens" in explicit:
+            options["num_predict"] = self.max_new_tokens
+        if self.seed is not None:
+            options["seed"] = int(self.seed)
+        return options or None
+
+    @staticmethod
+    def _ollama_text(out: Any) -> str:
+        if isinstance(out, dict):
+            return out.get("response", "")
+        # Newer ollama clients return a response object that also supports item access
+        response = getattr(out, "response", None)
+        return response if isinstance(response, str) else str(out)
 
     def deliverTransformersTokenizerPrompt(self) -> str:
-        model, tok = _TRANSFORMERS_CACHE.get_or_create(self.modelName)
-        text = self._chat_template(tok, self.messageContent or "")
+        if self.num_threads is not None:
+            _set_torch_threads(self.num_threads)
+        model, tok = _TRANSFORMERS_CACHE.get_or_create(self.modelName, self.quantization)
+        content = self.messageContent or ""
+        render_key = (content, self.systemPrompt)
+        if self._rendered_prompt is None or self._rendered_prompt[0] != render_key:
+            self._rendered_prompt = (render_key, self._chat_template(tok, content, self.systemPrompt))
+        text = self._rendered_prompt[1]
 
-        # Tokenize (keep on CPU and let accelerate handle device placement)
-        model_inputs = tok([text], return_tensors="pt")
+        # Tokenize once per rendered prompt and place inputs on the model's device up front
+        cache_key = (self.modelName, text)
+        if self._model_inputs is None or self._model_inputs[0] != cache_key:
+            encoded = tok([text], return_tensors="pt", padding=False)
+            if self.max_input_tokens is not None:
+                encoded = _keep_last_tokens(encoded, self.max_input_tokens)
+            device = _model_device(model)
+            if device is not None:
+                encoded = {k: v.to(device, non_blocking=True) for k, v in encoded.items()}
+            self._model_inputs = (cache_key, dict(encoded))
+        model_inputs = self._model_inputs[1]
 
-        gen_kwargs = {
-            "max_new_tokens": self.max_new_tokens,
-            "do_sample": True,
-            "temperature": self.temperature,
-            "top_p": self.top_p,
-        }
-        if self.seed is not None:
-            try:
-                import torch  # type: ignore
-                torch.manual_seed(int(self.seed))
-            except Exception:
-                pass
+        gen_kwargs = self._generate_kwargs()
+        # An explicit pad id avoids generate()'s "Setting pad_token_id" warning on every call
+        gen_kwargs["pad_token_id"] = _pad_token_id(tok)
 
-        generated_ids = model.generate(**model_inputs, **gen_kwargs)
+        prefix: Any = contextlib.nullcontext(None)
+        if _TRANSFORMERS_CACHE.is_compiled(self.modelName, self.quantization):
+            # Static shapes let the compiled decode graph be reused across calls
+            gen_kwargs.update(_static_generate_kwargs(tok))
+        elif self.systemPrompt:
+            # Skip prefill for the shared system-prompt prefix by resuming from its cached KV
+            system = str(self.systemPrompt)
+            prefix_text = _memo_render(tok, ("prefix", system), lambda: _render_prefix(tok, system))
+            if prefix_text and text.startswith(prefix_text):
+                prefix = _prefix_kv(model, tok, (self.modelName, self.quantization, prefix_text),
+                                    prefix_text, model_inputs["input_ids"])
+
+        with prefix as past:
+            if past is not None:
+                gen_kwargs["past_key_values"] = past
+            generated_ids = model.generate(**model_inputs, **gen_kwargs)
         # strip prompt tokens
-        trimmed = [out_ids[len(inp_ids):] for inp_ids, out_ids in zip(model_inputs.input_ids, generated_ids)]
+        trimmed = [out_ids[len(inp_ids):] for inp_ids, out_ids in zip(model_inputs["input_ids"], generated_ids)]
         response = tok.batch_decode(trimmed, skip_special_tokens=True)[0]
         return response
 
+    @classmethod
+    def deliverTransformersBatch(cls, prompts: Iterable["Prompt"]) -> list[str]:
+        """Generate for many local-transformers prompts with one padded model.generate() per model.
+        Sampling settings (temperature, max_new_tokens, ...) come from the first prompt of each model group.
+        """
+        prompts = list(prompts)
+        results: list[str] = [""] * len(prompts)
+        groups: dict[Tuple[str, Optional[str]], list[int]] = {}
+        for i, p in enumerate(prompts):
+            groups.setdefault((p.modelName, p.quantization), []).append(i)
+
+        for (model_name, quantization), idxs in groups.items():
+            if prompts[idxs[0]].num_threads is not None:
+                _set_torch_threads(prompts[idxs[0]].num_threads)
+            model, tok = _TRANSFORMERS_CACHE.get_or_create(model_name, quantization)
+            texts = [cls._chat_template(tok, prompts[i].messageContent or "", prompts[i].systemPrompt) for i in idxs]
+            rows = tok(texts, padding=False)["input_ids"]
+            max_input = prompts[idxs[0]].max_input_tokens
+            if max_input is not None:
+                rows = [ids[-max_input:] for ids in rows]
+            # The tokenizer is shared through _TRANSFORMERS_CACHE, so pad here rather than set
+            # its pad_token/padding_side
+            pad_id = _pad_token_id(tok)
+            inputs = _left_pad(rows, pad_id)
+            device = _model_device(model)
+            if device is not None:
+                inputs = {k: v.to(device, non_blocking=True) for k, v in inputs.items()}
+
+            gen_kwargs = prompts[idxs[0]]._generate_kwargs()
+            generated_ids = model.generate(**inputs, **gen_kwargs, pad_token_id=pad_id)
+            # With left padding every row's prompt ends at the same column
+            prompt_len = inputs["input_ids"].shape[1]
+            decoded = tok.batch_decode([row[prompt_len:] for row in generated_ids], skip_special_tokens=True)
+            for i, text in zip(idxs, decoded):
+                results[i] = text
+        return results
+
+    def _generate_kwargs(self) -> dict[str, Any]:
+        if self.temperature <= 0.0:
+            # Greedy decoding: skips the per-step logits warpers and sampler
+            gen_kwargs: dict[str, Any] = {"max_new_tokens": self.max_new_tokens, "do_sample": False, "num_beams": 1}
+        else:
+            gen_kwargs = {
+                "max_new_tokens": self.max_new_tokens,
+                "do_sample": True,
+                "temperature": self.temperature,
+                "top_p": self.top_p,
+            }
+        gen_kwargs["use_cache"] = True
+        if self.seed is not None:
+            try:
+                _optional("torch").manual_seed(int(self.seed))
+            except Exception:
+                pass
+        return gen_kwargs
+
     def deliverLiteLLMPrompt(self, **extra) -> str:
         """Deliver via LiteLLM. Set provider API keys via env vars (e.g., OPENROUTER_API_KEY).
         Usage:
@@ -268,52 +937,91 @@ class Prompt:
                    message="Hello",
                    promptStrategy=Prompt.deliverLiteLLMPrompt)
         """
+        litellm_completion = _optional("litellm", "completion")
         if litellm_completion is None:
             raise RuntimeError("litellm not installed: pip install litellm")
         if not self.messageContent:
             return ""
-        messages = self._build_messages()
+        if self.stream:
+            chunks = litellm_completion(**self._litellm_params({"stream": True, **(extra or {})}))
+            return self._collect_stream(chunks, self._delta_text)
+        resp = litellm_completion(**self._litellm_params(extra))  # openai-like response
+        return self._litellm_text(resp)
+
+    async def _deliverLiteLLMPromptAsync(self) -> str:
+        litellm_acompletion = _optional("litellm", "acompletion")
+        if litellm_acompletion is None:
+            raise RuntimeError("litellm not installed: pip install litellm")
+        if not self.messageContent:
+            return ""
+        resp = await litellm_acompletion(**self._litellm_params())
+        return self._litellm_text(resp)
+
+    def _litellm_params(self, extra: Optional[dict] = None) -> dict[str, Any]:
         params = {
             "model": self.modelName,
-            "messages": messages,
+            "messages": self._build_messages(),
             "temperature": self.temperature,
             "max_tokens": self.max_new_tokens,
             "top_p": self.top_p,
         }
         params.update(extra or {})
-        resp = litellm_completion(**params)  # openai-like response
-        # Extract text robustly
+        return params
+
+    @staticmethod
+    def _litellm_text(resp: Any) -> str:
+        # LiteLLM returns an OpenAI-shaped object; fall back to dict access, then to str()
         try:
-            if hasattr(resp, "choices"):
-                choices = resp.choices
-                if choices:
-                    msg = getattr(choices[0], "message", None)
-                    if msg is not None and hasattr(msg, "content"):
-                        return msg.content
-            if isinstance(resp, dict):
-                choices = resp.get("choices")
-                if choices:
-                    msg = choices[0].get("message") if isinstance(choices[0], dict) else None
-                    if isinstance(msg, dict):
-                        return msg.get("content", "")
-        except Exception:
-            pass
-        return str(resp)
+            return resp.choices[0].message.content or ""
+        except (AttributeError, IndexError, TypeError):
+            try:
+                return resp["choices"][0]["message"]["content"] or ""
+            except Exception:
+                return str(resp)
 
     # ----- Utilities -----
+    def _collect_stream(self, chunks: Iterable[Any], piece: Callable[[Any], Optional[str]]) -> str:
+        """Concatenate streamed text, stopping as soon as stop_on(text so far) is true."""
+        text = ""
+        stop_on = self.stop_on
+        try:
+            for chunk in chunks:
+                delta = piece(chunk)
+                if delta:
+                    text += delta
+                    if stop_on is not None and stop_on(text):
+                        break
+        finally:
+            # Closing the stream drops the connection so the server stops generating
+            close = getattr(chunks, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception:
+                    pass
+        return text
+
+    @staticmethod
+    def _delta_text(chunk: Any) -> Optional[str]:
+        try:
+            return chunk.choices[0].delta.content
+        except (AttributeError, IndexError, TypeError):
+            return None
+
     def _build_messages(self) -> list[dict[str, str]]:
+        # Reuse the last list while the message and system prompt are unchanged
+        key = (self.messageContent, self.systemPrompt)
+        if self._messages is not None and self._messages[0] == key:
+            return self._messages[1]
         msgs: list[dict[str, str]] = []
         if self.systemPrompt:
             msgs.append({"role": "system", "content": str(self.systemPrompt)})
         msgs.append({"role": "user", "content": self.messageContent or ""})
+        self._messages = (key, msgs)
         return msgs
 
     @staticmethod
-    def _chat_template(tokenizer: Any, content: str) -> str:
-        messages = [{"role": "user", "content": content}]
-        try:
-            # Not all tokenizers implement this; fallback to raw
-            return tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
-        except Exception:
-            return content
+    def _chat_template(tokenizer: Any, content: str, system: Optional[str] = None) -> str:
+        system = str(system) if system else None
+        return _memo_render(tokenizer, ("chat", content, system), lambda: _render_template(tokenizer, content, system))
 
@@ -35,8 +35,8 @@ This prints the final board after applying the sequence, and a JSON summary.
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from copy import deepcopy
-from typing import Dict, List, Optional, Tuple, Any
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple, Any
 import json
 import sys
 
@@ -57,16 +57,14 @@ def _ensure_fields(board: Dict[str, Any]) -> None:
         if not isinstance(m, list) or len(m) != r:
             board[name] = [[False] * c for _ in range(r)]
         else:
-            # fix row lengths
-            for i in range(r):
-                row = m[i] if i < len(m) and isinstance(m[i], list) else []
-                if len(row) != c:
-                    if len(row) < c:
-                        row = list(row) + [False] * (c - len(row))
-                    else:
-                        row = row[:c]
-                m[i] = [bool(x) for x in row]
-            board[name] = m
+            # fix row lengths; map(bool, ...) casts each row in C rather than per cell in Python
+            for i, row in enumerate(m):
+                if not isinstance(row, list):
+                    row = []
+                fixed = list(map(bool, row[:c]))
+                if len(fixed) < c:
+                    fixed += [False] * (c - len(fixed))
+                m[i] = fixed
 
     ensure_matrix('v_walls', rows, cols + 1)
     ensure_matrix('h_walls', rows + 1, cols)
@@ -103,48 +101,97 @@ def _in_bounds_rc(rc: Any, rows: int, cols: int) -> bool:
     )
 
 
-def _edge_blocked(board: Dict[str, Any], r: int, c: int, dr: int, dc: int) -> bool:
+def _closed_edges(board: Dict[str, Any], kind: str) -> List[List[bool]]:
+    """Per-edge blocked flags for the 'v' or 'h' edge matrices: a wall, or a present gate that is closed."""
+    return [
+        [w or (g and not o) for w, g, o in zip(w_row, g_row, o_row)]
+        for w_row, g_row, o_row in zip(board[f'{kind}_walls'], board[f'{kind}_gates'], board[f'{kind}_gate_open'])
+    ]
+
+
+def _pack_bits(matrix: List[List[bool]]) -> int:
+    """Pack a boolean matrix into an int, bit (r * width + c) set for each True cell."""
+    bits = 0
+    shift = 0
+    for row in matrix:
+        for i, v in enumerate(row):
+            if v:
+                bits |= 1 << (shift + i)
+        shift += len(row)
+    return bits
+
+
+# Blocked-direction bits in the per-cell tables built by _blocked_table
+_DIR_BITS: Dict[Tuple[int, int], int] = {(-1, 0): 1, (1, 0): 2, (0, -1): 4, (0, 1): 8}
+
+
+def _blocked_table(board: Dict[str, Any]) -> bytearray:
+    """Per-cell bitmask of blocked directions (bit 0 up, 1 down, 2 left, 3 right) under the
+    board's current gate state. Indexed by r * cols + c. Each edge is evaluated once; the grid
+    boundary needs no bounds checks because _ensure_fields forces boundary walls.
+    """
     rows = board['rows']
     cols = board['cols']
-    # bounds for target cell
-    nr = r + dr
-    nc = c + dc
-    if nr < 0 or nr >= rows or nc < 0 or nc >= cols:
-        return True
-    # determine edge occupancy
-    if dr == 0 and dc == -1:  # left
-        return board['v_walls'][r][c] or (board['v_gates'][r][c] and not board['v_gate_open'][r][c])
-    if dr == 0 and dc == 1:   # right
-        return board['v_walls'][r][c + 1] or (board['v_gates'][r][c + 1] and not board['v_gate_open'][r][c + 1])
-    if dr == -1 and dc == 0:  # up
-        return board['h_walls'][r][c] or (board['h_gates'][r][c] and not board['h_gate_open'][r][c])
-    if dr == 1 and dc == 0:   # down
-        return board['h_walls'][r + 1][c] or (board['h_gates'][r + 1][c] and not board['h_gate_open'][r + 1][c])
-    raise ValueError('Invalid direction')
-
-
-def _toggle_all_gates(board: Dict[str, Any]) -> int:
-    """Toggle OPEN/CLOSED state of all PRESENT gates; return number toggled.
-    A gate is passable if present and OPEN. We do NOT create/destroy gates here.
+    v_closed = _closed_edges(board, 'v')
+    h_closed = _closed_edges(board, 'h')
+    table = bytearray(rows * cols)
+    i = 0
+    for r in range(rows):
+        up, down, sides = h_closed[r], h_closed[r + 1], v_closed[r]
+        for c in range(cols):
+            table[i] = up[c] | down[c] << 1 | sides[c] << 2 | sides[c + 1] << 3
+            i += 1
+    return table
+
+
+def _resolve_last_mover(targets: List[int]) -> Tuple[List[bool], List[Tuple[int, List[int], int]]]:
+    """Resolve same-cell collisions after simultaneous moves: the last mover (highest index) wins.
+    `targets` are packed cell indices (r * cols + c). Returns per-mover alive flags and, for each
+    contested cell in order of its first appearance, (cell, loser indices, winner index).
+    One pass; lists are only built for actual collisions.
+    """
+    occ: Dict[int, int] = {}
+    dups: Dict[int, List[int]] = {}
+    for i, cell in enumerate(targets):
+        j = occ.get(cell)
+        if j is not None:
+            dups.setdefault(cell, [j]).append(i)
+        occ[cell] = i
+    alive = [True] * len(targets)
+    collisions: List[Tuple[int, List[int], int]] = []
+    if dups:
+        for cell in occ:
+            idxs = dups.get(cell)
+            if idxs:
+                losers = idxs[:-1]
+                for j in losers:
+                    alive[j] = False
+                collisions.append((cell, losers, idxs[-1]))
+    return alive, collisions
+
+
+def _chase_dir(blocked: int, horizontal_first: bool, r: int, c: int, pr: int, pc: int) -> Tuple[int, int]:
+    """One step from (r, c) towards the player at (pr, pc), or (0, 0) if no closing move is open.
+    `blocked` is the cell's blocked-direction mask. White mummies (and scorpions) try horizontal
+    first; red mummies try vertical first.
     """
-    cnt = 0
-    vg = board['v_gates']
-    v_open = board.get('v_gate_open')
-    hg = board['h_gates']
-    h_open = board.get('h_gate_open')
-    if v_open is None or h_open is None:
-        return 0
-    for r in range(len(vg)):
-        for c in range(len(vg[r])):
-            if vg[r][c]:
-                v_open[r][c] = not v_open[r][c]
-                cnt += 1
-    for r in range(len(hg)):
-        for c in range(len(hg[r])):
-            if hg[r][c]:
-                h_open[r][c] = not h_open[r][c]
-                cnt += 1
-    return cnt
+    # sign of the row/column deltas
+    sv = (pr > r) - (pr < r)
+    sh = (pc > c) - (pc < c)
+    h_open = sh != 0 and not blocked & (8 if sh > 0 else 4)
+    v_open = sv != 0 and not blocked & (2 if sv > 0 else 1)
+    if horizontal_first:
+        # horizontal first if closes distance and available
+        if h_open:
+            return (0, sh)
+        if v_open:
+            return (sv, 0)
+        return (0, 0)
+    if v_open:
+        return (sv, 0)
+    if h_open:
+        return (0, sh)
+    return (0, 0)
 
 
 DIRS: Dict[str, Tuple[int, int]] = {
@@ -154,8 +201,14 @@ DIRS: Dict[str, Tuple[int, int]] = {
     'RIGHT': (0, 1),
 }
 
+# Canonical action names; Game.step_fast takes an index into this tuple
+ACTIONS: Tuple[str, ...] = ('UP', 'DOWN', 'LEFT', 'RIGHT', 'WAIT', 'UNDO', 'RESET')
+_CANONICAL_ACTIONS = frozenset(ACTIONS)
+# Exact-match fast path for step()/step_micro(); anything else goes through Game.parse_action
+_ACTION_TABLE: Dict[str, str] = {v: a for a in ACTIONS for v in (a, a.lower(), a.title())}
 
-@dataclass
+
+@dataclass(slots=True)
 class StepResult:
     ok: bool
     action: str
@@ -166,18 +219,115 @@ class StepResult:
     won: bool
     done: bool
     reason: Optional[str]
+    # Rendered ASCII board; Game passes a frozen view of the board instead (see _LazyAscii)
     ascii: str
     phase: str = 'turn'
     events: List[Dict[str, Any]] = field(default_factory=list)
 
 
+class _LazyAscii:
+    """StepResult.ascii slot that renders a board view to text on first read and keeps the text.
+
+    Every read (attribute access, ==, repr, dataclasses.asdict) goes through __get__, so a result
+    behaves exactly as if it had been built with the rendered string.
+    """
+    __slots__ = ('slot',)
+
+    def __init__(self, slot: Any):
+        self.slot = slot
+
+    def __get__(self, obj: Any, objtype: Any = None) -> Any:
+        if obj is None:
+            return self
+        text = self.slot.__get__(obj, objtype)
+        if not isinstance(text, str):
+            text = board_to_double_res_text(text)
+            self.slot.__set__(obj, text)
+        return text
+
+    def __set__(self, obj: Any, value: Any) -> None:
+        self.slot.__set__(obj, value)
+
+
+StepResult.ascii = _LazyAscii(StepResult.ascii)  # type: ignore[assignment]
+
+
 class Game:
     def __init__(self, board: Dict[str, Any]):
-        b = deepcopy(board)
+        # _ensure_fields replaces every matrix row and entity list it keeps, so copying the
+        # top-level lists is enough to leave the caller's board untouched (no deepcopy).
+        b = {k: (list(v) if isinstance(v, list) else v) for k, v in board.items()}
         _ensure_fields(b)
-        self.initial = deepcopy(b)
+        self.initial = b
+        self.board = b
+        # Gate positions never change, so toggling only has to visit these cells
+        self._v_gate_cells = [(r, c) for r, row in enumerate(b['v_gates']) for c, g in enumerate(row) if g]
+        self._h_gate_cells = [(r, c) for r, row in enumerate(b['h_gates']) for c, g in enumerate(row) if g]
+        self._gate_count = len(self._v_gate_cells) + len(self._h_gate_cells)
+        # Blocked-direction tables, packed (v, h) gate-open bitboards and immutable gate-open rows
+        # for even/odd gate-toggle parity; toggling all gates twice restores the original state,
+        # so these two cover every reachable gate state.
+        self._cols = b['cols']
+        self._toggles = 0
+        even = _blocked_table(b)
+        even_open = (_pack_bits(b['v_gate_open']), _pack_bits(b['h_gate_open']))
+        even_rows = (tuple(map(tuple, b['v_gate_open'])), tuple(map(tuple, b['h_gate_open'])))
+        self._toggle_gates()
+        odd = _blocked_table(b)
+        odd_open = (_pack_bits(b['v_gate_open']), _pack_bits(b['h_gate_open']))
+        odd_rows = (tuple(map(tuple, b['v_gate_open'])), tuple(map(tuple, b['h_gate_open'])))
+        self._toggle_gates()
+        self._blocked_tables = (even, odd)
+        self._open_bits = (even_open, odd_open)
+        self._open_rows = (even_rows, odd_rows)
+        self._toggles = 0  # gate toggles applied since reset; parity is all UNDO needs
+        # Keys and traps are static bitboards (bit r * cols + c); enemy occupancy sets are
+        # kept in step with the enemy lists by each phase, restore() and UNDO
+        cols = b['cols']
+        self._key_bits = sum({1 << (r * cols + c) for r, c in b['keys']})
+        self._trap_bits = sum({1 << (r * cols + c) for r, c in b['traps']})
+        # Player cell as an (r, c) tuple, kept in step with board['player'] on every write;
+        # the exit never moves (only list-shaped exits count, as before).
+        p = b['player']
+        self.player: Optional[Tuple[int, int]] = (p[0], p[1]) if p else None
+        e = b['exit']
+        self._exit: Optional[Tuple[int, int]] = (e[0], e[1]) if isinstance(e, list) else None
+        # Enemies are held structure-of-arrays style: one packed-index list per kind, plus
+        # a cell -> (r, c) table to unpack them
+        self._cell_rc = [divmod(i, cols) for i in range(b['rows'] * cols)]
+        self._set_enemies(
+            [r * cols + c for r, c in b['white_mummies']],
+            [r * cols + c for r, c in b['red_mummies']],
+            [r * cols + c for r, c in b['scorpions']],
+        )
+        # Gate state is always the initial state flipped by toggle parity, so enemy moves are
+        # memoized on (order, cell, player cell, parity) for this board.
+        self._chase_memo: Dict[Tuple[Any, ...], Tuple[int, int]] = {}
+        self._dispatch: Dict[str, Callable[[str, bool], StepResult]] = {'RESET': self._do_reset, 'UNDO': self._do_undo}
+        for a in ('UP', 'DOWN', 'LEFT', 'RIGHT', 'WAIT'):
+            self._dispatch[a] = self._do_turn
+        self.done = False
+        self.won = False
+        self.step_count = 0
+        self._initial_state = self.snapshot()
         self.reset()
 
+    def _toggle_gates(self) -> int:
+        """Toggle OPEN/CLOSED state of all PRESENT gates; return number toggled.
+        A gate is passable if present and OPEN. We do NOT create/destroy gates here.
+        """
+        # Flip copies of the rows rather than the rows in place, so shallow board copies
+        # (e.g. the view behind a lazy StepResult.ascii) keep the gate state they were taken with
+        b = self.board
+        v_open = b['v_gate_open'] = list(map(list, b['v_gate_open']))
+        h_open = b['h_gate_open'] = list(map(list, b['h_gate_open']))
+        for r, c in self._v_gate_cells:
+            v_open[r][c] = not v_open[r][c]
+        for r, c in self._h_gate_cells:
+            h_open[r][c] = not h_open[r][c]
+        self._toggles += 1
+        return self._gate_count
+
     @classmethod
     def from_json_file(cls, path: str) -> 'Game':
         with open(path, 'r', encoding='utf-8') as f:
@@ -185,28 +335,119 @@ class Game:
         return cls(b)
 
     def reset(self) -> None:
-        self.board = deepcopy(self.initial)
+        # Static fields (walls, gates, keys, traps, exit) are never mutated by the game, so the
+        # live board shares them with `initial`; only the mutable state is rebuilt.
+        self.board = dict(self.initial)
+        self.restore(self._initial_state)
         self.done = False
         self.won = False
-        self.history: List[Dict[str, Any]] = []
+        self.history: List[Tuple[Any, ...]] = []
         self.step_count = 0
         self.phase = 'player'  # micro-step phase: 'player' -> 'mummy1' -> 'mummy2' -> 'scorpion' -> 'player'
         self._phase_events: List[Dict[str, Any]] = []
         self._phase_toggled: int = 0
 
-    def snapshot(self) -> Dict[str, Any]:
-        return {
-            'board': deepcopy(self.board),
-            'done': self.done,
-            'won': self.won,
-            'step_count': self.step_count,
-        }
-
-    def restore(self, snap: Dict[str, Any]) -> None:
-        self.board = snap['board']
-        self.done = snap['done']
-        self.won = snap['won']
-        self.step_count = snap.get('step_count', 0)
+    def snapshot(self) -> Tuple[Any, ...]:
+        """Compact immutable copy of the mutable game state, for restore().
+        Returns a 10-tuple (it used to be a dict of deep-copied board fields):
+        (player, whites, reds, scorpions, v_gate_open bits, h_gate_open bits, gate toggles, done, won, step_count)
+        Entities become tuples and the gate-open matrices become int bitmasks, so taking a
+        snapshot never deep-copies the board.
+        """
+        # The cell table already holds (r, c) tuples, so enemies map straight across; the
+        # gate-open bitboards depend only on toggle parity and were packed at construction
+        rc = self._cell_rc.__getitem__
+        v_open, h_open = self._open_bits[self._toggles & 1]
+        return (
+            self.player,
+            tuple(map(rc, self._white_pos)),
+            tuple(map(rc, self._red_pos)),
+            tuple(map(rc, self._scorp_pos)),
+            v_open,
+            h_open,
+            self._toggles,
+            self.done,
+            self.won,
+            self.step_count,
+        )
+
+    def restore(self, snap: Tuple[Any, ...]) -> None:
+        """Return to a state taken by snapshot() on this game.
+        Raises ValueError if the snapshot's gate bits are not the state its toggle count implies:
+        movement uses the blocked tables prebuilt per toggle parity, so any other gate state
+        would render one way and move another.
+        """
+        player, whites, reds, scorps, v_open, h_open, toggles, done, won, step_count = snap
+        parity = toggles & 1
+        if (v_open, h_open) != self._open_bits[parity]:
+            raise ValueError('snapshot gate state does not match its gate toggle count')
+        b = self.board
+        cols = b['cols']
+        self.player = player
+        b['player'] = list(player) if player is not None else None
+        v_rows, h_rows = self._open_rows[parity]
+        b['v_gate_open'] = list(map(list, v_rows))
+        b['h_gate_open'] = list(map(list, h_rows))
+        self._toggles = toggles
+        self.done = done
+        self.won = won
+        self.step_count = step_count
+        self._set_enemies(
+            [r * cols + c for r, c in whites],
+            [r * cols + c for r, c in reds],
+            [r * cols + c for r, c in scorps],
+        )
+
+    def _journal(self) -> Tuple[Any, ...]:
+        """UNDO record for the coming action: entity positions, flags and the gate-toggle counter.
+        Toggling is its own inverse, so gate state needs no copy; only the toggle parity matters.
+        Enemy positions are stored as packed cell indices in compact int arrays.
+        """
+        return (
+            self.player,
+            array('i', self._white_pos),
+            array('i', self._red_pos),
+            array('i', self._scorp_pos),
+            self._toggles,
+            self.done,
+            self.won,
+            self.step_count,
+        )
+
+    def _undo(self, entry: Tuple[Any, ...]) -> None:
+        player, whites, reds, scorps, toggles, done, won, step_count = entry
+        if (self._toggles - toggles) & 1:
+            self._toggle_gates()
+        self._toggles = toggles
+        self.player = player
+        self.board['player'] = list(player) if player is not None else None
+        self.done = done
+        self.won = won
+        self.step_count = step_count
+        self._set_enemies(list(whites), list(reds), list(scorps))
+
+    def _set_enemies(self, whites: List[int], reds: List[int], scorps: List[int], sync: bool = True) -> None:
+        """Install enemy positions given as packed cell indices (r * cols + c), in board order.
+        The packed lists are what the enemy phases work on; the occupancy sets are derived from
+        them here, and the board lists too unless sync is False.
+        """
+        self._white_pos = whites
+        self._red_pos = reds
+        self._scorp_pos = scorps
+        if sync:
+            self._sync_enemy_lists()
+        self._white_cells = set(whites)
+        self._red_cells = set(reds)
+        self._enemy_cells = self._white_cells | self._red_cells
+        self._enemy_cells.update(scorps)
+
+    def _sync_enemy_lists(self) -> None:
+        # Write the packed enemy positions back to the board's [r, c] lists
+        rc = self._cell_rc
+        b = self.board
+        b['white_mummies'] = [list(rc[i]) for i in self._white_pos]
+        b['red_mummies'] = [list(rc[i]) for i in self._red_pos]
+        b['scorpions'] = [list(rc[i]) for i in self._scorp_pos]
 
     @staticmethod
     def parse_action(s: str) -> Optional[str]:
@@ -220,21 +461,26 @@ class Game:
             _, t2 = t.split(':', 1)
             t = t2.strip()
         t = t.upper()
-        if t in DIRS or t in {'WAIT', 'UNDO', 'RESET'}:
+        if t in _CANONICAL_ACTIONS:
             return t
         return None
 
     def to_text(self, join_style: str = 'auto') -> str:
         return board_to_double_res_text(self.board, join_style=join_style)
 
+    def _ascii(self, render: bool) -> Any:
+        # Nothing in the board is mutated in place (entity lists and gate rows are replaced),
+        # so a shallow copy freezes the state for StepResult to render only if asked
+        return dict(self.board) if render else ''
+
     def current_phase(self) -> str:
         return getattr(self, 'phase', 'player')
 
-    def step_micro(self, action: Action) -> StepResult:
+    def step_micro(self, action: Action, render: bool = True) -> StepResult:
         """Advance exactly one simulation phase.
         Phases: player -> mummy1 -> mummy2 -> scorpion -> player -> ...
         Only the player phase consumes an action; other phases ignore it.
-        Returns a StepResult with events from this micro-step.
+        Returns a StepResult with events from this micro-step; with render=False its ascii is ''.
         """
         # Initialize per-phase event buffer
         self._phase_events = []
@@ -242,22 +488,23 @@ class Game:
         ph = self.current_phase()
 
         if ph == 'player':
-            a = self.parse_action(action)
+            a = _ACTION_TABLE.get(action) if isinstance(action, str) else None
+            if a is None:
+                a = self.parse_action(action)
             if a is None:
-                return StepResult(False, str(action), False, False, 0, self._pos(), self.won, self.done, 'invalid_action', self.to_text(), phase=ph, events=self._phase_events)
+                return StepResult(False, str(action), False, False, 0, self._pos(), self.won, self.done, 'invalid_action', self._ascii(render), phase=ph, events=self._phase_events)
             if a == 'RESET':
                 self.reset()
-                return StepResult(True, a, False, False, 0, self._pos(), self.won, self.done, None, self.to_text(), phase='player', events=self._phase_events)
+                return StepResult(True, a, False, False, 0, self._pos(), self.won, self.done, None, self._ascii(render), phase='player', events=self._phase_events)
             if a == 'UNDO':
                 if not self.history:
-                    return StepResult(False, a, False, False, 0, self._pos(), self.won, self.done, 'no_history', self.to_text(), phase=ph, events=self._phase_events)
-                snap = self.history.pop()
-                self.restore(snap)
-                return StepResult(True, a, False, False, 0, self._pos(), self.won, self.done, None, self.to_text(), phase='player', events=self._phase_events)
+                    return StepResult(False, a, False, False, 0, self._pos(), self.won, self.done, 'no_history', self._ascii(render), phase=ph, events=self._phase_events)
+                self._undo(self.history.pop())
+                return StepResult(True, a, False, False, 0, self._pos(), self.won, self.done, None, self._ascii(render), phase='player', events=self._phase_events)
             if self.done:
-                return StepResult(False, a, False, False, 0, self._pos(), self.won, self.done, 'game_over', self.to_text(), phase=ph, events=self._phase_events)
-            # Record snapshot for UNDO
-            self.history.append(self.snapshot())
+                return StepResult(False, a, False, False, 0, self._pos(), self.won, self.done, 'game_over', self._ascii(render), phase=ph, events=self._phase_events)
+            # Journal entry for UNDO
+            self.history.append(self._journal())
             moved = False
             blocked = False
             toggled = 0
@@ -270,15 +517,16 @@ class Game:
                     blocked = True
                 else:
                     pr, pc = prc
-                    if _edge_blocked(self.board, pr, pc, dr, dc):
+                    if self._cell_blocked(pr, pc) & _DIR_BITS[(dr, dc)]:
                         blocked = True
                     else:
                         # Move
                         self._phase_events.append({'type': 'move', 'entity': 'player', 'from': [pr, pc], 'to': [pr+dr, pc+dc]})
+                        self.player = (pr + dr, pc + dc)
                         self.board['player'] = [pr + dr, pc + dc]
                         moved = True
                         if self._on_key():
-                            toggled = _toggle_all_gates(self.board)
+                            toggled = self._toggle_gates()
                             if toggled:
                                 self._phase_events.append({'type': 'toggle_gates', 'by': 'player', 'at': self.board['player'], 'count': toggled})
             # Post effects
@@ -294,11 +542,11 @@ class Game:
             if not self.done:
                 self.phase = 'mummy1'
             self.step_count += 1
-            return StepResult(True, a, moved, blocked, toggled, self._pos(), self.won, self.done, None, self.to_text(), phase=ph, events=self._phase_events)
+            return StepResult(True, a, moved, blocked, toggled, self._pos(), self.won, self.done, None, self._ascii(render), phase=ph, events=self._phase_events)
 
         # Enemy phases (ignore action)
         if self.done:
-            return StepResult(False, str(action), False, False, 0, self._pos(), self.won, self.done, 'game_over', self.to_text(), phase=ph, events=self._phase_events)
+            return StepResult(False, str(action), False, False, 0, self._pos(), self.won, self.done, 'game_over', self._ascii(render), phase=ph, events=self._phase_events)
 
         if ph == 'mummy1' or ph == 'mummy2':
             self._mummy_phase()
@@ -310,7 +558,7 @@ class Game:
             # Advance phase
             self.phase = 'mummy2' if ph == 'mummy1' else 'scorpion'
             self.step_count += 1
-            return StepResult(True, f'PHASE:{ph}', False, False, self._phase_toggled, self._pos(), self.won, self.done, None, self.to_text(), phase=ph, events=self._phase_events)
+            return StepResult(True, f'PHASE:{ph}', False, False, self._phase_toggled, self._pos(), self.won, self.done, None, self._ascii(render), phase=ph, events=self._phase_events)
 
         if ph == 'scorpion':
             self._scorpion_phase()
@@ -321,34 +569,50 @@ class Game:
             # loop back to player
             self.phase = 'player'
             self.step_count += 1
-            return StepResult(True, 'PHASE:scorpion', False, False, self._phase_toggled, self._pos(), self.won, self.done, None, self.to_text(), phase=ph, events=self._phase_events)
+            return StepResult(True, 'PHASE:scorpion', False, False, self._phase_toggled, self._pos(), self.won, self.done, None, self._ascii(render), phase=ph, events=self._phase_events)
 
         # Unknown phase fallback
         self.phase = 'player'
-        return StepResult(False, str(action), False, False, 0, self._pos(), self.won, self.done, 'invalid_phase', self.to_text(), phase=ph, events=self._phase_events)
+        return StepResult(False, str(action), False, False, 0, self._pos(), self.won, self.done, 'invalid_phase', self._ascii(render), phase=ph, events=self._phase_events)
 
-    def step(self, action: Action) -> StepResult:
-        a = self.parse_action(action)
+    def step(self, action: Action, render: bool = True) -> StepResult:
+        # render=False skips the ASCII board (StepResult.ascii == '') for programmatic callers.
+        # Plain action names (e.g. 'UP', 'up', 'Up') skip parse_action's strip/split/upper
+        a = _ACTION_TABLE.get(action) if isinstance(action, str) else None
         if a is None:
-            return StepResult(False, str(action), False, False, 0, self._pos(), self.won, self.done, 'invalid_action', self.to_text())
+            a = self.parse_action(action)
+        if a is None:
+            return StepResult(False, str(action), False, False, 0, self._pos(), self.won, self.done, 'invalid_action', self._ascii(render))
+        return self._dispatch[a](a, render)
 
-        if a == 'RESET':
-            self.reset()
-            return StepResult(True, a, False, False, 0, self._pos(), self.won, self.done, None, self.to_text())
+    def step_fast(self, action_id: int, render: bool = True) -> StepResult:
+        """Apply ACTIONS[action_id] with no string handling at all (for solvers and batch callers)."""
+        a = ACTIONS[action_id]
+        return self._dispatch[a](a, render)
+
+    def _do_reset(self, a: str, render: bool) -> StepResult:
+        self.reset()
+        return StepResult(True, a, False, False, 0, self._pos(), self.won, self.done, None, self._ascii(render))
 
-        if a == 'UNDO':
-            if not self.history:
-                return StepResult(False, a, False, False, 0, self._pos(), self.won, self.done, 'no_history', self.to_text())
-            snap = self.history.pop()
-            self.restore(snap)
-            return StepResult(True, a, False, False, 0, self._pos(), self.won, self.done, None, self.to_text())
+    def _do_undo(self, a: str, render: bool) -> StepResult:
+        if not self.history:
+            return StepResult(False, a, False, False, 0, self._pos(), self.won, self.done, 'no_history', self._ascii(render))
+        self._undo(self.history.pop())
+        return StepResult(True, a, False, False, 0, self._pos(), self.won, self.done, None, self._ascii(render))
 
+    def _do_turn(self, a: str, render: bool) -> StepResult:
+        # Full turn for a movement action or WAIT: player, then enemies
         if self.done:
-            return StepResult(False, a, False, False, 0, self._pos(), self.won, self.done, 'game_over', self.to_text())
+            return StepResult(False, a, False, False, 0, self._pos(), self.won, self.done, 'game_over', self._ascii(render))
 
-        # Record state for UNDO
-        self.history.append(self.snapshot())
+        # Journal entry for UNDO
+        self.history.append(self._journal())
+        moved, blocked, toggled = self._play_turn(a)
+        return StepResult(True, a, moved, blocked, toggled, self._pos(), self.won, self.done, None, self._ascii(render))
 
+    def _play_turn(self, a: str) -> Tuple[bool, bool, int]:
+        """Apply a movement action or WAIT and the enemy turn that follows; returns
+        (moved, blocked, toggled). No journaling or rendering happens here."""
         moved = False
         blocked = False
         toggled = 0
@@ -363,15 +627,16 @@ class Game:
                 # No player set on board
                 blocked = True
             else:
-                if _edge_blocked(self.board, pr, pc, dr, dc):
+                if self._cell_blocked(pr, pc) & _DIR_BITS[(dr, dc)]:
                     blocked = True
                 else:
                     # Move
+                    self.player = (pr + dr, pc + dc)
                     self.board['player'] = [pr + dr, pc + dc]
                     moved = True
                     # Step onto key? toggle all gates
                     if self._on_key():
-                        toggled = _toggle_all_gates(self.board)
+                        toggled = self._toggle_gates()
 
         # Check traps (lose immediately if on trap)
         if self._on_trap():
@@ -386,229 +651,211 @@ class Game:
             self._enemies_turn()
 
         self.step_count += 1
+        return moved, blocked, toggled
 
-        return StepResult(True, a, moved, blocked, toggled, self._pos(), self.won, self.done, None, self.to_text())
+    def batch_step(self, states: List[Tuple[Any, ...]], actions: List[int]) -> List[Tuple[Tuple[Any, ...], bool, bool]]:
+        """Advance many snapshot() states by one action each, for search over this board.
+        `actions` are indices into ACTIONS and must be turn actions (moves or WAIT); finished
+        states are returned unchanged. Returns (next snapshot, done, won) per pair. Nothing is
+        journaled or rendered, and the game is left in the state it was in.
+        """
+        saved = self.snapshot()
+        out: List[Tuple[Tuple[Any, ...], bool, bool]] = []
+        try:
+            for state, action_id in zip(states, actions):
+                a = ACTIONS[action_id]
+                if a not in DIRS and a != 'WAIT':
+                    raise ValueError(f'batch_step only accepts turn actions, got {a}')
+                self.restore(state)
+                if not self.done:
+                    self._play_turn(a)
+                out.append((self.snapshot(), self.done, self.won))
+        finally:
+            self.restore(saved)
+        return out
 
     # Enemy turn processing -------------------------------------------------
     def _enemies_turn(self) -> None:
-        # Two mummy steps (white and red), then one scorpion step
-        for _ in range(2):
-            if self.done:
-                return
+        # Two mummy steps (white and red), then one scorpion step. Each phase leaves the
+        # packed positions and occupancy sets up to date for the next one, so nothing is
+        # re-indexed in between; the first mummy step skips writing the board lists, which
+        # the second (or a capture) writes once.
+        self._mummy_phase(sync=False)
+        captured = self._player_captured()
+        if captured:
+            self._sync_enemy_lists()
+        else:
             self._mummy_phase()
-            if self._player_captured():
-                self.done = True
-                self.won = False
-                return
-        if not self.done:
+            captured = self._player_captured()
+        if not captured:
             self._scorpion_phase()
-            if self._player_captured():
-                self.done = True
-                self.won = False
+            captured = self._player_captured()
+        if captured:
+            self.done = True
+            self.won = False
 
     def _player_captured(self) -> bool:
         p = self._pos()
-        if p is None:
-            return False
         # Any enemy on player's cell?
-        for rc in (self.board.get('white_mummies') or []):
-            if rc[0] == p[0] and rc[1] == p[1]:
-                return True
-        for rc in (self.board.get('red_mummies') or []):
-            if rc[0] == p[0] and rc[1] == p[1]:
-                return True
-        for rc in (self.board.get('scorpions') or []):
-            if rc[0] == p[0] and rc[1] == p[1]:
-                return True
-        return False
-
-    def _mummy_phase(self) -> None:
+        return p is not None and p[0] * self._cols + p[1] in self._enemy_cells
+
+    def _mummy_phase(self, sync: bool = True) -> None:
         # Reset phase log
         self._phase_events = []
         self._phase_toggled = 0
-        # Build list of mummies in a deterministic order: whites then reds
-        mummies = [("white", [int(r), int(c)]) for (r,c) in (self.board.get('white_mummies') or [])]
-        mummies += [("red", [int(r), int(c)]) for (r,c) in (self.board.get('red_mummies') or [])]
-        scorpions = [[int(r), int(c)] for (r,c) in (self.board.get('scorpions') or [])]
-
-        # 1) Compute intended moves for all mummies (no collisions resolved yet)
-        intended: list[tuple[str, list[int], list[int]]] = []  # (typ, from_rc, to_rc)
-        for (typ, rc) in mummies:
-            r, c = rc
-            dr, dc = self._mummy_dir(typ, r, c)
-            nr, nc = r + dr, c + dc
-            if dr == 0 and dc == 0 or _edge_blocked(self.board, r, c, dr, dc):
-                intended.append((typ, [r, c], [r, c]))
+        # Hoist attribute and dict loads out of the per-enemy loops
+        cols = self._cols
+        rc = self._cell_rc
+        events = self._phase_events
+        chase = self._chase
+        blocked = self._blocked_tables[self._toggles & 1]
+        dir_bits = _DIR_BITS
+        # All mummies in one flat array in a deterministic order: whites occupy [0, n_white),
+        # reds follow. Cells are packed indices r * cols + c.
+        n_white = len(self._white_pos)
+        cells = self._white_pos + self._red_pos
+        scorpions = self._scorp_pos
+
+        # 1) Compute intended moves for all mummies (no collisions resolved yet).
+        #    No gate toggles happen before step 4, so the blocked table for the current
+        #    parity is valid throughout.
+        targets: list[int] = []
+        p = self._pos()
+        for i, idx in enumerate(cells):
+            r, c = rc[idx]
+            dr, dc = (0, 0) if p is None else chase(i < n_white, r, c, p[0], p[1])
+            if dr == 0 and dc == 0 or blocked[idx] & dir_bits[(dr, dc)]:
+                targets.append(idx)
             else:
-                intended.append((typ, [r, c], [nr, nc]))
-                self._phase_events.append({'type': 'move', 'entity': typ, 'from': [r, c], 'to': [nr, nc]})
+                targets.append(idx + dr * cols + dc)
+                events.append({'type': 'move', 'entity': 'white' if i < n_white else 'red', 'from': [r, c], 'to': [r + dr, c + dc]})
 
         # 2) Resolve collisions among mummies AFTER all moved: last mover wins
-        # Group by target cell
-        targets: dict[tuple[int,int], list[int]] = {}
-        for idx, (_typ, _frm, to) in enumerate(intended):
-            key = (to[0], to[1])
-            targets.setdefault(key, []).append(idx)
-        alive_mummy = [True] * len(intended)
-        for key, idxs in targets.items():
-            if len(idxs) > 1:
-                winner_idx = max(idxs)  # last mover wins by order
-                winner_typ = intended[winner_idx][0]
-                for j in idxs:
-                    if j == winner_idx:
-                        continue
-                    if alive_mummy[j]:
-                        alive_mummy[j] = False
-                        self._phase_events.append({'type': 'collision', 'winner': winner_typ, 'loser': 'mummy', 'at': [key[0], key[1]]})
+        alive_mummy, collisions = _resolve_last_mover(targets)
+        for to, losers, winner_idx in collisions:
+            winner_typ = 'white' if winner_idx < n_white else 'red'
+            for _ in losers:
+                events.append({'type': 'collision', 'winner': winner_typ, 'loser': 'mummy', 'at': list(rc[to])})
 
         # 3) Resolve mummy vs scorpion: mummies survive
         alive_scorp = [True] * len(scorpions)
-        pos_to_scorp = {(r,c): i for i, (r,c) in enumerate(scorpions)}
-        for i, (typ, _frm, to) in enumerate(intended):
+        pos_to_scorp = {idx: i for i, idx in enumerate(scorpions)}
+        for i, to in enumerate(targets):
             if not alive_mummy[i]:
                 continue
-            sidx = pos_to_scorp.get((to[0], to[1]))
+            sidx = pos_to_scorp.get(to)
             if sidx is not None and alive_scorp[sidx]:
                 alive_scorp[sidx] = False
-                self._phase_events.append({'type': 'collision', 'winner': typ, 'loser': 'scorpion', 'at': [to[0], to[1]]})
+                events.append({'type': 'collision', 'winner': 'white' if i < n_white else 'red', 'loser': 'scorpion', 'at': list(rc[to])})
 
         # 4) Apply toggles for any keys stepped on (order doesn't matter for parity)
-        for i, (typ, _frm, to) in enumerate(intended):
-            if not alive_mummy[i]:
-                continue
-            if self._cell_has_key(to[0], to[1]):
-                tcnt = _toggle_all_gates(self.board)
+        key_bits = self._key_bits
+        for i, to in enumerate(targets):
+            if alive_mummy[i] and key_bits >> to & 1:
+                tcnt = self._toggle_gates()
                 self._phase_toggled += tcnt
                 if tcnt:
-                    self._phase_events.append({'type': 'toggle_gates', 'by': typ, 'at': [to[0], to[1]], 'count': tcnt})
-
-        # 5) Commit survivors to board
-        survivors: list[tuple[str, list[int]]] = []
-        for i, (typ, _frm, to) in enumerate(intended):
-            if alive_mummy[i]:
-                survivors.append((typ, [to[0], to[1]]))
-        self.board['white_mummies'] = [pos for (t, pos) in survivors if t == 'white']
-        self.board['red_mummies'] = [pos for (t, pos) in survivors if t == 'red']
-        self.board['scorpions'] = [scorpions[i] for i in range(len(scorpions)) if alive_scorp[i]]
-
-    def _mummy_dir(self, typ: str, r: int, c: int) -> tuple[int, int]:
-        # Direction towards player based on priority
-        p = self._pos()
-        if p is None:
-            return (0, 0)
-        pr, pc = p
-        dv = pr - r
-        dh = pc - c
-        # sign
-        sv = 1 if dv > 0 else (-1 if dv < 0 else 0)
-        sh = 1 if dh > 0 else (-1 if dh < 0 else 0)
-        if typ == 'white':
-            # horizontal first if closes distance and available
-            if sh != 0 and not _edge_blocked(self.board, r, c, 0, sh):
-                return (0, sh)
-            if sv != 0 and not _edge_blocked(self.board, r, c, sv, 0):
-                return (sv, 0)
-            return (0, 0)
-        else:  # 'red'
-            if sv != 0 and not _edge_blocked(self.board, r, c, sv, 0):
-                return (sv, 0)
-            if sh != 0 and not _edge_blocked(self.board, r, c, 0, sh):
-                return (0, sh)
-            return (0, 0)
+                    events.append({'type': 'toggle_gates', 'by': 'white' if i < n_white else 'red', 'at': list(rc[to]), 'count': tcnt})
+
+        # 5) Commit survivors
+        self._set_enemies(
+            [targets[i] for i in range(n_white) if alive_mummy[i]],
+            [targets[i] for i in range(n_white, len(targets)) if alive_mummy[i]],
+            [idx for i, idx in enumerate(scorpions) if alive_scorp[i]],
+            sync,
+        )
+
+    def _chase(self, horizontal_first: bool, r: int, c: int, pr: int, pc: int) -> Tuple[int, int]:
+        key = (horizontal_first, r, c, pr, pc, self._toggles & 1)
+        d = self._chase_memo.get(key)
+        if d is None:
+            d = self._chase_memo[key] = _chase_dir(self._cell_blocked(r, c), horizontal_first, r, c, pr, pc)
+        return d
+
+    def _cell_blocked(self, r: int, c: int) -> int:
+        """Blocked-direction mask of cell (r, c) under the current gate state."""
+        return self._blocked_tables[self._toggles & 1][r * self._cols + c]
 
     def _scorpion_phase(self) -> None:
         # Reset phase log
         self._phase_events = []
         self._phase_toggled = 0
+        # Hoist attribute and dict loads out of the per-enemy loops
+        cols = self._cols
+        rc = self._cell_rc
+        events = self._phase_events
+        chase = self._chase
+        blocked = self._blocked_tables[self._toggles & 1]
+        dir_bits = _DIR_BITS
         # Scorpions move one step towards player (simultaneous resolution)
-        scs = [[int(r), int(c)] for (r,c) in (self.board.get('scorpions') or [])]
-        # Intended moves
-        intended: list[tuple[list[int], list[int]]] = []  # (from, to)
-        for (r,c) in scs:
-            dr, dc = self._scorpion_dir(r, c)
-            nr, nc = r + dr, c + dc
-            if dr == 0 and dc == 0 or _edge_blocked(self.board, r, c, dr, dc):
-                intended.append(([r,c],[r,c]))
+        # Intended moves as packed cell indices
+        targets: list[int] = []
+        p = self._pos()
+        for idx in self._scorp_pos:
+            r, c = rc[idx]
+            # Scorpions chase like white mummies (horizontal first), one step per turn
+            dr, dc = (0, 0) if p is None else chase(True, r, c, p[0], p[1])
+            if dr == 0 and dc == 0 or blocked[idx] & dir_bits[(dr, dc)]:
+                targets.append(idx)
             else:
-                intended.append(([r,c],[nr,nc]))
-                self._phase_events.append({'type': 'move', 'entity': 'scorpion', 'from': [r, c], 'to': [nr, nc]})
+                targets.append(idx + dr * cols + dc)
+                events.append({'type': 'move', 'entity': 'scorpion', 'from': [r, c], 'to': [r + dr, c + dc]})
 
         # Resolve scorpion-vs-scorpion collisions after all moved: last mover wins
-        targets: dict[tuple[int,int], list[int]] = {}
-        for idx, (_frm, to) in enumerate(intended):
-            key = (to[0], to[1])
-            targets.setdefault(key, []).append(idx)
-        alive_scorp = [True] * len(intended)
-        for key, idxs in targets.items():
-            if len(idxs) > 1:
-                winner_idx = max(idxs)
-                for j in idxs:
-                    if j == winner_idx:
-                        continue
-                    if alive_scorp[j]:
-                        alive_scorp[j] = False
-                        self._phase_events.append({'type': 'collision', 'winner': 'scorpion', 'loser': 'scorpion', 'at': [key[0], key[1]]})
+        alive_scorp, collisions = _resolve_last_mover(targets)
+        for to, losers, _winner_idx in collisions:
+            for _ in losers:
+                events.append({'type': 'collision', 'winner': 'scorpion', 'loser': 'scorpion', 'at': list(rc[to])})
 
         # Resolve scorpion vs mummy: mummy survives
-        mummy_positions = {tuple(rc) for rc in (self.board.get('white_mummies') or [])}
-        mummy_positions.update({tuple(rc) for rc in (self.board.get('red_mummies') or [])})
-        for i, (_frm, to) in enumerate(intended):
+        white_cells = self._white_cells
+        red_cells = self._red_cells
+        for i, to in enumerate(targets):
             if not alive_scorp[i]:
                 continue
-            if (to[0], to[1]) in mummy_positions:
+            if to in white_cells or to in red_cells:
                 alive_scorp[i] = False
-                # Identify mummy type for logging if possible
-                mt = 'white' if [to[0], to[1]] in (self.board.get('white_mummies') or []) else ('red' if [to[0], to[1]] in (self.board.get('red_mummies') or []) else 'mummy')
-                self._phase_events.append({'type': 'collision', 'winner': mt, 'loser': 'scorpion', 'at': [to[0], to[1]]})
+                # Identify mummy type for logging
+                mt = 'white' if to in white_cells else 'red'
+                events.append({'type': 'collision', 'winner': mt, 'loser': 'scorpion', 'at': list(rc[to])})
 
         # Apply key toggles for surviving scorpions
-        for i, (_frm, to) in enumerate(intended):
-            if not alive_scorp[i]:
-                continue
-            if self._cell_has_key(to[0], to[1]):
-                tcnt = _toggle_all_gates(self.board)
+        key_bits = self._key_bits
+        for i, to in enumerate(targets):
+            if alive_scorp[i] and key_bits >> to & 1:
+                tcnt = self._toggle_gates()
                 self._phase_toggled += tcnt
                 if tcnt:
-                    self._phase_events.append({'type': 'toggle_gates', 'by': 'scorpion', 'at': [to[0], to[1]], 'count': tcnt})
-
-        # Commit
-        self.board['scorpions'] = [[to[0], to[1]] for i, (_frm, to) in enumerate(intended) if alive_scorp[i]]
+                    events.append({'type': 'toggle_gates', 'by': 'scorpion', 'at': list(rc[to]), 'count': tcnt})
 
-    def _scorpion_dir(self, r: int, c: int) -> tuple[int, int]:
-        # Move like a mummy (white behavior: horizontal-first if it reduces distance), but only one step overall.\r
-        return self._mummy_dir('white', r, c)
+        # Commit; mummies did not move this phase, so only the scorpion state changes
+        survivors = [to for i, to in enumerate(targets) if alive_scorp[i]]
+        self._scorp_pos = survivors
+        self.board['scorpions'] = [list(rc[i]) for i in survivors]
+        self._enemy_cells = white_cells | red_cells
+        self._enemy_cells.update(survivors)
 
     # helpers
     def _pos(self) -> Optional[Tuple[int, int]]:
-        p = self.board.get('player')
-        if isinstance(p, list) and len(p) == 2:
-            return int(p[0]), int(p[1])
-        return None
+        return self.player
 
     def _on_exit(self) -> bool:
-        p = self.board.get('player')
-        e = self.board.get('exit')
-        return isinstance(p, list) and isinstance(e, list) and p == e
+        p = self.player
+        return p is not None and p == self._exit
 
     def _on_key(self) -> bool:
-        p = self.board.get('player')
-        if not (isinstance(p, list) and len(p) == 2):
-            return False
-        pr, pc = p
-        return self._cell_has_key(pr, pc)
+        p = self.player
+        return p is not None and self._cell_has_key(p[0], p[1])
 
     def _on_trap(self) -> bool:
-        p = self.board.get('player')
-        if not (isinstance(p, list) and len(p) == 2):
-            return False
-        pr, pc = p
-        return self._cell_has_trap(pr, pc)
+        p = self.player
+        return p is not None and self._cell_has_trap(p[0], p[1])
 
     def _cell_has_key(self, r: int, c: int) -> bool:
-        return any((k and len(k) == 2 and k[0] == r and k[1] == c) for k in (self.board.get('keys') or []))
+        return bool(self._key_bits >> (r * self._cols + c) & 1)
 
     def _cell_has_trap(self, r: int, c: int) -> bool:
-        return any((t and len(t) == 2 and t[0] == r and t[1] == c) for t in (self.board.get('traps') or []))
+        return bool(self._trap_bits >> (r * self._cols + c) & 1)
 
 
 def _main(argv: List[str]) -> int:
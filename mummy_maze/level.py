@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import cached_property
 from pathlib import Path
-from typing import List, Tuple
+from typing import FrozenSet, List, Optional, Tuple
 
-from .types import Position, TileType, MummyType
+from .types import Position, TileType, MummyType, STEP_BITS
 
 
 @dataclass
@@ -16,6 +17,10 @@ class Level:
     explorer: Position
     mummies: List[Tuple[MummyType, Position]]
     scorpions: List[Position]
+    # Blocked-direction bitmasks per cell, indexed by gate_open; see blocked_masks()
+    _blocked_masks: List[Optional[List[int]]] = field(
+        default_factory=lambda: [None, None], init=False, repr=False, compare=False
+    )
 
     def in_bounds(self, pos: Position) -> bool:
         return 0 <= pos.x < self.width and 0 <= pos.y < self.height
@@ -23,6 +28,45 @@ class Level:
     def tile_at(self, pos: Position) -> TileType:
         return self.tiles[pos.y][pos.x]
 
+    def blocked_masks(self, gate_open: bool) -> List[int]:
+        """Per cell (index y * width + x), a bitmask of the STEP_BITS moves that are blocked.
+
+        Walls and gates never change within a level, so each gate state is tabulated once, on first
+        use, and the hot paths test a bit instead of re-running is_blocked_with_edge_check.
+        """
+        masks = self._blocked_masks[gate_open]
+        if masks is None:
+            masks = self._blocked_masks[gate_open] = self._build_blocked_masks(gate_open)
+        return masks
+
+    def _build_blocked_masks(self, gate_open: bool) -> List[int]:
+        # Same rules as is_blocked_with_edge_check: a move is blocked if its destination is out of
+        # bounds, a wall or a closed gate, and every move out of a wall tile is blocked
+        w, h = self.width, self.height
+        tiles = self.tiles
+        closed = (TileType.WALL,) if gate_open else (TileType.WALL, TileType.GATE)
+        all_bits = sum(STEP_BITS.values())
+        masks: List[int] = []
+        for y in range(h):
+            for x in range(w):
+                if tiles[y][x] == TileType.WALL:
+                    masks.append(all_bits)
+                    continue
+                m = 0
+                for (dx, dy), bit in STEP_BITS.items():
+                    nx, ny = x + dx, y + dy
+                    if not (0 <= nx < w and 0 <= ny < h) or tiles[ny][nx] in closed:
+                        m |= bit
+                masks.append(m)
+        return masks
+
+    @cached_property
+    def key_cells(self) -> FrozenSet[Tuple[int, int]]:
+        """(x, y) of every key tile."""
+        return frozenset(
+            (x, y) for y, row in enumerate(self.tiles) for x, tile in enumerate(row) if tile == TileType.KEY
+        )
+
 
 CHAR_TO_TILE = {
     "#": TileType.WALL,
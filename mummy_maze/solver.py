@@ -2,12 +2,14 @@ from __future__ import annotations
 
 import heapq
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
-from .types import Position, ALL_STEPS
+from .types import Position
 from .level import Level
 from .state import (
+    Cell,
     EntityState,
+    ZobristTable,
     initial_state_for_level,
     enumerate_player_moves,
     simulate_enemies,
@@ -21,47 +23,63 @@ class Step:
     description: str
 
 
-def reconstruct_path(came_from: Dict[Tuple, Tuple[Tuple, Step]], current_key: Tuple) -> List[Step]:
+def reconstruct_path(came_from: Dict[int, Tuple[int, Cell]], current_key: int) -> List[Step]:
+    # came_from maps a state key to (previous key, explorer cell moved to); Steps are only
+    # built for the final path
     steps: List[Step] = []
     while current_key in came_from:
-        prev_key, step = came_from[current_key]
-        steps.append(step)
+        prev_key, cell = came_from[current_key]
+        pos = Position(*cell)
+        steps.append(Step(position=pos, description=f"Player to {pos}"))
         current_key = prev_key
     steps.reverse()
     return steps
 
 
+def exit_positions(level: Level) -> List[Tuple[int, int]]:
+    return [(x, y) for y in range(level.height) for x in range(level.width) if level.tiles[y][x].name == "EXIT"]
+
+
 def heuristic_to_exit(level: Level, pos: Position) -> int:
-    # Find nearest exit tile by Manhattan distance
-    best = 0
-    found_any = False
-    for y in range(level.height):
-        for x in range(level.width):
-            if level.tiles[y][x].name == "EXIT":
-                d = abs(x - pos.x) + abs(y - pos.y)
-                if not found_any or d < best:
-                    best = d
-                    found_any = True
-    return best if found_any else 0
+    # Nearest exit tile by Manhattan distance
+    exits = exit_positions(level)
+    return min(abs(x - pos.x) + abs(y - pos.y) for x, y in exits) if exits else 0
 
 
 def solve(level: Level, max_expansions: int = 200000) -> Optional[List[Step]]:
     start = initial_state_for_level(level)
-    start_key = start.key()
-
-    open_heap: List[Tuple[int, int, Tuple, EntityState]] = []
-    g_score: Dict[Tuple, int] = {start_key: 0}
-    came_from: Dict[Tuple, Tuple[Tuple, Step]] = {}
-
-    f0 = heuristic_to_exit(level, start.explorer)
+    # States are keyed by a Zobrist hash: a few additions instead of building sorted nested tuples
+    zobrist = ZobristTable.for_level(level)
+    start_key = start.zkey(zobrist)
+
+    # Exits never move, so scan the grid once and memoize the heuristic per explorer cell
+    exits = exit_positions(level)
+    h_cache: Dict[Tuple[int, int], int] = {}
+
+    def h(pos: Cell) -> int:
+        v = h_cache.get(pos)
+        if v is None:
+            px, py = pos
+            v = h_cache[pos] = min(abs(x - px) + abs(y - py) for x, y in exits) if exits else 0
+        return v
+
+    open_heap: List[Tuple[int, int, int, EntityState]] = []
+    g_score: Dict[int, int] = {start_key: 0}
+    came_from: Dict[int, Tuple[int, Cell]] = {}
+    # Manhattan distance is consistent, so a state's first pop has its best g and any later
+    # entry for the same key is stale
+    expanded: Set[int] = set()
+
+    f0 = h(start.explorer)
     heapq.heappush(open_heap, (f0, 0, start_key, start))
 
     expansions = 0
 
     while open_heap:
         _, g, key, state = heapq.heappop(open_heap)
-        if g != g_score.get(key, 10 ** 9):
+        if key in expanded:
             continue
+        expanded.add(key)
 
         # If already at exit (after player's move step), consider solved
         if is_exit(level, state.explorer):
@@ -71,30 +89,24 @@ def solve(level: Level, max_expansions: int = 200000) -> Optional[List[Step]]:
             return None
         expansions += 1
 
-        # Generate player moves
-        for dx, dy in ALL_STEPS:
-            nxt_pos = state.explorer.move(dx, dy)
-            # Simulate via enumerate to check legality
-            legal_moves = {p.as_tuple() for p in enumerate_player_moves(level, state)}
-            if nxt_pos.as_tuple() not in legal_moves:
-                continue
-
+        # Generate player moves: the legal ones, computed once per expansion in ALL_STEPS order
+        for nxt_pos in enumerate_player_moves(level, state):
             # Immediate win if stepping on exit before enemies move
             if is_exit(level, nxt_pos):
-                step = Step(position=nxt_pos, description=f"Player to {nxt_pos}")
-                came_from[(state.explorer.move(dx, dy).as_tuple(), tuple(sorted(((mt.name, p.as_tuple()) for mt, p in state.mummies))), tuple(sorted((p.as_tuple() for p in state.scorpions))), state.gate_open)] = (key, step)
-                return reconstruct_path(came_from, (state.explorer.move(dx, dy).as_tuple(), tuple(sorted(((mt.name, p.as_tuple()) for mt, p in state.mummies))), tuple(sorted((p.as_tuple() for p in state.scorpions))), state.gate_open))
+                win_key = EntityState(nxt_pos, state.mummies, state.scorpions, state.gate_open).zkey(zobrist)
+                came_from[win_key] = (key, nxt_pos)
+                return reconstruct_path(came_from, win_key)
 
             next_state, captured = simulate_enemies(level, state, nxt_pos)
             if captured or next_state is None:
                 continue
 
-            next_key = next_state.key()
+            next_key = next_state.zkey(zobrist)
             tentative_g = g + 1
             if tentative_g < g_score.get(next_key, 10 ** 9):
                 g_score[next_key] = tentative_g
-                came_from[next_key] = (key, Step(position=nxt_pos, description=f"Player to {nxt_pos}"))
-                f = tentative_g + heuristic_to_exit(level, next_state.explorer)
+                came_from[next_key] = (key, nxt_pos)
+                f = tentative_g + h(next_state.explorer)
                 heapq.heappush(open_heap, (f, tentative_g, next_key, next_state))
 
     return None
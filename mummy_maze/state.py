@@ -1,39 +1,101 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable, List, Sequence, Tuple
+import random
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 from .types import (
-    Position,
     TileType,
     MummyType,
     CARDINAL_STEPS,
     ALL_STEPS,
+    STEP_BITS,
 )
 from .level import Level
 
 
+# Internal cell coordinates are plain (x, y) tuples: cheaper to build, hash and compare than
+# Position. Level and solver results keep exposing Position.
+Cell = Tuple[int, int]
+
+
 @dataclass(frozen=True)
 class EntityState:
-    explorer: Position
-    mummies: Tuple[Tuple[MummyType, Position], ...]
-    scorpions: Tuple[Position, ...]
+    explorer: Cell
+    mummies: Tuple[Tuple[MummyType, Cell], ...]
+    scorpions: Tuple[Cell, ...]
     gate_open: bool
+    # The state is immutable, so key() and its hash are computed on first use and kept
+    _key: Optional[Tuple] = field(default=None, init=False, repr=False, compare=False)
+    _hash: Optional[int] = field(default=None, init=False, repr=False, compare=False)
 
     def key(self) -> Tuple:
-        # Sorting ensures canonical key independent of insertion order
-        return (
-            self.explorer.as_tuple(),
-            tuple(sorted(((mt.name, p.as_tuple()) for mt, p in self.mummies))),
-            tuple(sorted((p.as_tuple() for p in self.scorpions))),
-            self.gate_open,
+        k = self._key
+        if k is None:
+            # Sorting ensures canonical key independent of insertion order
+            k = (
+                self.explorer,
+                tuple(sorted((mt.name, p) for mt, p in self.mummies)),
+                tuple(sorted(self.scorpions)),
+                self.gate_open,
+            )
+            object.__setattr__(self, "_key", k)
+        return k
+
+    def __hash__(self) -> int:
+        h = self._hash
+        if h is None:
+            h = hash(self.key())
+            object.__setattr__(self, "_hash", h)
+        return h
+
+    def zkey(self, table: "ZobristTable") -> int:
+        # Summing the codes is order-independent, so unlike key() nothing needs sorting. Sum
+        # rather than XOR: scorpions may share a cell, and equal XOR codes would cancel out.
+        w = table.width
+        ex, ey = self.explorer
+        k = table.explorer[ey * w + ex]
+        for mt, (x, y) in self.mummies:
+            k += table.mummies[mt][y * w + x]
+        scorpion = table.scorpion
+        for x, y in self.scorpions:
+            k += scorpion[y * w + x]
+        if self.gate_open:
+            k += table.gate
+        return k
+
+
+@dataclass(frozen=True)
+class ZobristTable:
+    """Random 64-bit codes per (entity kind, cell) for hashing an EntityState into one int."""
+    width: int
+    explorer: List[int]
+    mummies: Dict[MummyType, List[int]]
+    scorpion: List[int]
+    gate: int
+
+    @classmethod
+    def for_level(cls, level: Level, seed: int = 0) -> "ZobristTable":
+        rng = random.Random(seed)
+        n = level.width * level.height
+
+        def codes() -> List[int]:
+            return [rng.getrandbits(64) for _ in range(n)]
+
+        return cls(
+            width=level.width,
+            explorer=codes(),
+            mummies={mt: codes() for mt in MummyType},
+            scorpion=codes(),
+            gate=rng.getrandbits(64),
         )
 
 
-def is_blocked(level: Level, pos: Position, gate_open: bool) -> bool:
-    if not level.in_bounds(pos):
+def is_blocked(level: Level, pos: Cell, gate_open: bool) -> bool:
+    x, y = pos
+    if not (0 <= x < level.width and 0 <= y < level.height):
         return True
-    tile = level.tile_at(pos)
+    tile = level.tiles[y][x]
     if tile == TileType.WALL:
         return True
     if tile == TileType.GATE and not gate_open:
@@ -41,41 +103,24 @@ def is_blocked(level: Level, pos: Position, gate_open: bool) -> bool:
     return False
 
 
-def has_edge_wall_between(level: Level, from_pos: Position, to_pos: Position) -> bool:
+def has_edge_wall_between(level: Level, from_pos: Cell, to_pos: Cell) -> bool:
     """Check if there's a wall between two adjacent positions."""
-    if not level.in_bounds(from_pos) or not level.in_bounds(to_pos):
+    fx, fy = from_pos
+    tx, ty = to_pos
+    w, h = level.width, level.height
+    if not (0 <= fx < w and 0 <= fy < h and 0 <= tx < w and 0 <= ty < h):
         return True
-    
-    # Calculate the edge between the two positions
-    dx = to_pos.x - from_pos.x
-    dy = to_pos.y - from_pos.y
-    
+
     # Only check for adjacent positions
-    if abs(dx) + abs(dy) != 1:
+    if abs(tx - fx) + abs(ty - fy) != 1:
         return False
-        
-    # For horizontal movement, check if there's a vertical wall
-    if dx != 0:  # Horizontal movement
-        # Check if the tile we're moving to has a vertical wall character
-        if level.tile_at(to_pos) == TileType.WALL:
-            return True
-        # Also check if there's a wall character in the current tile that blocks this direction
-        if level.tile_at(from_pos) == TileType.WALL:
-            return True
-    
-    # For vertical movement, check if there's a horizontal wall
-    if dy != 0:  # Vertical movement
-        # Check if the tile we're moving to has a horizontal wall character
-        if level.tile_at(to_pos) == TileType.WALL:
-            return True
-        # Also check if there's a wall character in the current tile that blocks this direction
-        if level.tile_at(from_pos) == TileType.WALL:
-            return True
-    
-    return False
+
+    # Horizontal and vertical moves are blocked alike by a wall tile on either end
+    tiles = level.tiles
+    return tiles[ty][tx] == TileType.WALL or tiles[fy][fx] == TileType.WALL
 
 
-def is_blocked_with_edge_check(level: Level, from_pos: Position, to_pos: Position, gate_open: bool) -> bool:
+def is_blocked_with_edge_check(level: Level, from_pos: Cell, to_pos: Cell, gate_open: bool) -> bool:
     """Check if movement is blocked, including edge walls."""
     # First check if the destination tile itself is blocked
     if is_blocked(level, to_pos, gate_open):
@@ -88,21 +133,22 @@ def is_blocked_with_edge_check(level: Level, from_pos: Position, to_pos: Positio
     return False
 
 
-def is_exit(level: Level, pos: Position) -> bool:
-    return level.tile_at(pos) == TileType.EXIT
+def is_exit(level: Level, pos: Cell) -> bool:
+    return level.tiles[pos[1]][pos[0]] == TileType.EXIT
 
 
-def is_trap(level: Level, pos: Position) -> bool:
-    return level.tile_at(pos) == TileType.TRAP
+def is_trap(level: Level, pos: Cell) -> bool:
+    return level.tiles[pos[1]][pos[0]] == TileType.TRAP
 
 
-def is_key(level: Level, pos: Position) -> bool:
-    return level.tile_at(pos) == TileType.KEY
+def is_key(level: Level, pos: Cell) -> bool:
+    return level.tiles[pos[1]][pos[0]] == TileType.KEY
 
 
-def step_towards(prefer_axis_first: str, src: Position, dst: Position, level: Level, gate_open: bool) -> Position:
-    dx = dst.x - src.x
-    dy = dst.y - src.y
+def step_towards(prefer_axis_first: str, src: Cell, dst: Cell, level: Level, gate_open: bool) -> Cell:
+    sx, sy = src
+    dx = dst[0] - sx
+    dy = dst[1] - sy
     candidates: List[Tuple[int, int]] = []
     if prefer_axis_first == "h":
         if dx != 0:
@@ -115,130 +161,125 @@ def step_towards(prefer_axis_first: str, src: Position, dst: Position, level: Le
         if dx != 0:
             candidates.append((1 if dx > 0 else -1, 0))
     # If aligned on one axis, we might have only one candidate
+    blocked = level.blocked_masks(gate_open)[sy * level.width + sx]
     for step in candidates:
-        nxt = src.move(*step)
-        if not is_blocked_with_edge_check(level, src, nxt, gate_open):
-            return nxt
+        if not blocked & STEP_BITS[step]:
+            return (sx + step[0], sy + step[1])
     # If all preferred steps blocked, stay in place
     return src
 
 
-def scorpion_step(src: Position, dst: Position, level: Level, gate_open: bool) -> Position:
-    dx = abs(dst.x - src.x)
-    dy = abs(dst.y - src.y)
+def scorpion_step(src: Cell, dst: Cell, level: Level, gate_open: bool) -> Cell:
+    sx, sy = src
+    tx, ty = dst
+    dx = abs(tx - sx)
+    dy = abs(ty - sy)
     # Move toward explorer on dominant axis; fallback to other axis
     if dx >= dy:
-        primary = (1 if dst.x > src.x else -1, 0) if dx != 0 else None
-        secondary = (0, 1 if dst.y > src.y else -1) if dy != 0 else None
+        primary = (1 if tx > sx else -1, 0) if dx != 0 else None
+        secondary = (0, 1 if ty > sy else -1) if dy != 0 else None
     else:
-        primary = (0, 1 if dst.y > src.y else -1) if dy != 0 else None
-        secondary = (1 if dst.x > src.x else -1, 0) if dx != 0 else None
+        primary = (0, 1 if ty > sy else -1) if dy != 0 else None
+        secondary = (1 if tx > sx else -1, 0) if dx != 0 else None
+    blocked = level.blocked_masks(gate_open)[sy * level.width + sx]
     for step in (primary, secondary):
         if step is None:
             continue
-        nxt = src.move(*step)
-        if not is_blocked_with_edge_check(level, src, nxt, gate_open):
-            return nxt
+        if not blocked & STEP_BITS[step]:
+            return (sx + step[0], sy + step[1])
     return src
 
 
-def toggle_gate_if_on_key(pos: Position, gate_open: bool, level: Level) -> bool:
+def toggle_gate_if_on_key(pos: Cell, gate_open: bool, level: Level) -> bool:
     if is_key(level, pos):
         return not gate_open
     return gate_open
 
 
-def enumerate_player_moves(level: Level, state: EntityState) -> List[Position]:
-    results: List[Position] = []
-    for dx, dy in ALL_STEPS:
-        nxt = state.explorer.move(dx, dy)
-        if is_blocked_with_edge_check(level, state.explorer, nxt, state.gate_open):
+def enumerate_player_moves(level: Level, state: EntityState) -> List[Cell]:
+    results: List[Cell] = []
+    ex, ey = state.explorer
+    # Cannot move into enemy square initially
+    occupied = {p for _, p in state.mummies}
+    occupied.update(state.scorpions)
+    blocked = level.blocked_masks(state.gate_open)[ey * level.width + ex]
+    for step, bit in STEP_BITS.items():
+        if blocked & bit:
             continue
+        nxt = (ex + step[0], ey + step[1])
         if is_trap(level, nxt):
             continue
-        # Cannot move into enemy square initially
-        occupied = {p.as_tuple() for _, p in state.mummies}
-        occupied.update(p.as_tuple() for p in state.scorpions)
-        if nxt.as_tuple() in occupied:
+        if nxt in occupied:
             continue
         results.append(nxt)
     return results
 
 
-def resolve_enemy_collisions(mummies: List[Tuple[MummyType, Position]], scorpions: List[Position]) -> Tuple[List[Tuple[MummyType, Position]], List[Position]]:
+def resolve_enemy_collisions(mummies: List[Tuple[MummyType, Cell]], scorpions: List[Cell]) -> Tuple[List[Tuple[MummyType, Cell]], List[Cell]]:
     # If mummy and scorpion occupy same cell -> scorpion dies.
-    scorpion_set = {p.as_tuple() for p in scorpions}
-    kept_scorpions: List[Position] = []
-    mummy_positions = {p.as_tuple() for _, p in mummies}
-    for s in scorpions:
-        if s.as_tuple() not in mummy_positions:
-            kept_scorpions.append(s)
+    mummy_positions = {p for _, p in mummies}
+    if len(mummy_positions) == len(mummies) and mummy_positions.isdisjoint(scorpions):
+        # Nothing collided, which is the common case
+        return mummies, scorpions
+    kept_scorpions = [s for s in scorpions if s not in mummy_positions]
 
     # If two mummies collide, one is destroyed: remove the later-moving one (stable by order)
-    seen: set[Tuple[int, int]] = set()
-    kept_mummies: List[Tuple[MummyType, Position]] = []
+    seen: set[Cell] = set()
+    kept_mummies: List[Tuple[MummyType, Cell]] = []
     for mt, pos in mummies:
-        key = pos.as_tuple()
-        if key in seen:
+        if pos in seen:
             # drop this one
             continue
-        seen.add(key)
+        seen.add(pos)
         kept_mummies.append((mt, pos))
 
     return kept_mummies, kept_scorpions
 
 
-def simulate_enemies(level: Level, state: EntityState, explorer_after_move: Position) -> Tuple[EntityState | None, bool]:
-    gate_open = state.gate_open
-    mummies: List[Tuple[MummyType, Position]] = list(state.mummies)
-    scorpions: List[Position] = list(state.scorpions)
+def _mummies_step(
+    level: Level, mummies: List[Tuple[MummyType, Cell]], target: Cell, gate_open: bool
+) -> Tuple[List[Tuple[MummyType, Cell]] | None, bool]:
+    """Move every mummy one step toward target, in order; returns None for mummies on capture."""
+    keys = level.key_cells
+    moved: List[Tuple[MummyType, Cell]] = []
+    for mt, pos in mummies:
+        nxt = step_towards("h" if mt == MummyType.WHITE else "v", pos, target, level, gate_open)
+        if nxt in keys:
+            gate_open = not gate_open
+        if nxt == target:
+            return None, gate_open
+        moved.append((mt, nxt))
+    return moved, gate_open
 
+
+def simulate_enemies(level: Level, state: EntityState, explorer_after_move: Cell) -> Tuple[EntityState | None, bool]:
     # Scorpions move one step per turn (after player), mummies move two steps (with capture checks after each)
     # Movement order per substep: mummies step 1, check capture; mummies step 2, check capture; then scorpions step 1, check capture.
+    keys = level.key_cells
 
     # Toggle gates if the explorer just stepped on a key
-    gate_open = toggle_gate_if_on_key(explorer_after_move, gate_open, level)
-
-    # Mummy step 1
-    new_mummies: List[Tuple[MummyType, Position]] = []
-    for mt, pos in mummies:
-        if mt == MummyType.WHITE:
-            nxt = step_towards("h", pos, explorer_after_move, level, gate_open)
-        else:
-            nxt = step_towards("v", pos, explorer_after_move, level, gate_open)
-        gate_open = toggle_gate_if_on_key(nxt, gate_open, level)
-        new_mummies.append((mt, nxt))
-        if nxt == explorer_after_move:
-            return None, True
-    mummies = new_mummies
-
-    # Resolve mummy-mummy collisions after step 1
-    mummies, scorpions = resolve_enemy_collisions(mummies, scorpions)
-
-    # Mummy step 2
-    new_mummies = []
-    for mt, pos in mummies:
-        if mt == MummyType.WHITE:
-            nxt = step_towards("h", pos, explorer_after_move, level, gate_open)
-        else:
-            nxt = step_towards("v", pos, explorer_after_move, level, gate_open)
-        gate_open = toggle_gate_if_on_key(nxt, gate_open, level)
-        new_mummies.append((mt, nxt))
-        if nxt == explorer_after_move:
+    gate_open = state.gate_open
+    if explorer_after_move in keys:
+        gate_open = not gate_open
+
+    # Mummies take two steps, resolving mummy-mummy collisions after each
+    mummies: List[Tuple[MummyType, Cell]] | None = list(state.mummies)
+    scorpions: List[Cell] = list(state.scorpions)
+    for _ in range(2):
+        mummies, gate_open = _mummies_step(level, mummies, explorer_after_move, gate_open)
+        if mummies is None:
             return None, True
-    mummies = new_mummies
-
-    # Resolve mummy-mummy collisions after step 2
-    mummies, scorpions = resolve_enemy_collisions(mummies, scorpions)
+        mummies, scorpions = resolve_enemy_collisions(mummies, scorpions)
 
     # Scorpion step 1
-    new_scorpions: List[Position] = []
+    new_scorpions: List[Cell] = []
     for pos in scorpions:
         nxt = scorpion_step(pos, explorer_after_move, level, gate_open)
-        gate_open = toggle_gate_if_on_key(nxt, gate_open, level)
-        new_scorpions.append(nxt)
+        if nxt in keys:
+            gate_open = not gate_open
         if nxt == explorer_after_move:
             return None, True
+        new_scorpions.append(nxt)
     scorpions = new_scorpions
 
     # Resolve mummy-scorpion collisions
@@ -257,10 +298,8 @@ def simulate_enemies(level: Level, state: EntityState, explorer_after_move: Posi
 
 def initial_state_for_level(level: Level) -> EntityState:
     return EntityState(
-        explorer=level.explorer,
-        mummies=tuple(level.mummies),
-        scorpions=tuple(level.scorpions),
+        explorer=level.explorer.as_tuple(),
+        mummies=tuple((mt, p.as_tuple()) for mt, p in level.mummies),
+        scorpions=tuple(p.as_tuple() for p in level.scorpions),
         gate_open=level.gate_open,
     )
-
-
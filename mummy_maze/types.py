@@ -44,5 +44,8 @@ STAY = (0, 0)
 CARDINAL_STEPS = (UP, DOWN, LEFT, RIGHT)
 ALL_STEPS = (UP, DOWN, LEFT, RIGHT, STAY)
 
+# Bit for each move delta in a Level.blocked_masks() entry, in ALL_STEPS order
+STEP_BITS = {step: 1 << i for i, step in enumerate(ALL_STEPS)}
+
 
 
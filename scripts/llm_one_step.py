@@ -26,23 +26,22 @@ INSTRUCTIONS = (
 )
 
 ALLOWED = {"UP", "DOWN", "LEFT", "RIGHT", "WAIT", "UNDO", "RESET"}
+ACTION_RE = re.compile(r"Action\s*:\s*([A-Za-z]+)")
+FALLBACK_RE = re.compile(r"\b(UP|DOWN|LEFT|RIGHT|WAIT|UNDO|RESET)\b")
 
 
 def parse_action(text: str) -> str | None:
     if not isinstance(text, str):
         return None
     # Prefer explicit "Action: <ACTION>"
-    m = re.search(r"Action\s*:\s*([A-Za-z]+)", text)
+    m = ACTION_RE.search(text)
     if m:
         cand = m.group(1).strip().upper()
         if cand in ALLOWED:
             return cand
-    # Fallback: first allowed token found in text
-    up = text.upper()
-    for a in ["UP", "DOWN", "LEFT", "RIGHT", "WAIT", "UNDO", "RESET"]:
-        if a in up:
-            return a
-    return None
+    # Fallback: first allowed whole word found in text
+    m2 = FALLBACK_RE.search(text.upper())
+    return m2.group(1) if m2 else None
 
 
 def main():
@@ -0,0 +1,228 @@
+import asyncio
+import contextlib
+import os
+import sys
+import types
+from collections import OrderedDict
+
+import pytest
+
+# Ensure repo root on path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import llm_prompt  # type: ignore
+
+
+def fake_optional(monkeypatch, **modules):
+    """Serve fake backends from llm_prompt._optional(modname, attr); anything else is unavailable."""
+    def _optional(modname, attr=None):
+        module = modules.get(modname)
+        if module is None:
+            return None
+        return getattr(module, attr) if attr else module
+    monkeypatch.setattr(llm_prompt, '_optional', _optional)
+
+
+class FakeIds:
+    """Just enough of a token-id tensor for _prefix_kv: shape, [row, :n] slicing and tolist()."""
+    def __init__(self, rows):
+        self.rows = rows
+
+    @property
+    def shape(self):
+        return (len(self.rows), len(self.rows[0]))
+
+    def __getitem__(self, idx):
+        if isinstance(idx, tuple):
+            row, cols = idx
+            return FakeIds(self.rows[row][cols])
+        return FakeIds(self.rows[idx])
+
+    def tolist(self):
+        return self.rows
+
+
+class FakeCache:
+    def __init__(self):
+        self.crops = []
+
+    def crop(self, n):
+        self.crops.append(n)
+
+
+class FakePrefixModel:
+    def __init__(self):
+        self.prefills = 0
+        self.cache = FakeCache()
+
+    def __call__(self, input_ids, use_cache):
+        self.prefills += 1
+        return types.SimpleNamespace(past_key_values=self.cache)
+
+
+def fake_prefix_tokenizer(texts, return_tensors):
+    return {'input_ids': FakeIds([[1, 2, 3]])}
+
+
+@pytest.fixture
+def prefix_env(monkeypatch):
+    fake_optional(monkeypatch, torch=types.SimpleNamespace(no_grad=contextlib.nullcontext))
+    monkeypatch.setattr(llm_prompt, '_PREFIX_KV', OrderedDict())
+    return FakePrefixModel()
+
+
+def test_prefix_kv_computed_once_and_cropped_back(prefix_env):
+    model = prefix_env
+    for _ in range(2):
+        with llm_prompt._prefix_kv(model, fake_prefix_tokenizer, ('m', None, 'sys'), 'sys',
+                                   FakeIds([[1, 2, 3, 7, 8]])) as past:
+            assert past is model.cache
+    assert model.prefills == 1
+    # After each generate the shared cache is restored to the 3 prefix tokens
+    assert model.cache.crops == [3, 3]
+
+
+def test_prefix_kv_mismatch_falls_back_to_full_prefill(prefix_env):
+    model = prefix_env
+    key = ('m', None, 'sys')
+    with llm_prompt._prefix_kv(model, fake_prefix_tokenizer, key, 'sys', FakeIds([[1, 9, 3, 7]])) as past:
+        assert past is None
+    # Nothing left to prefill after the prefix: also a full prefill
+    with llm_prompt._prefix_kv(model, fake_prefix_tokenizer, key, 'sys', FakeIds([[1, 2, 3]])) as past:
+        assert past is None
+    assert model.cache.crops == []
+
+
+def test_prefix_kv_without_torch_yields_none(monkeypatch):
+    fake_optional(monkeypatch)
+    with llm_prompt._prefix_kv(FakePrefixModel(), fake_prefix_tokenizer, ('m', None, 's'), 's',
+                               FakeIds([[1, 2, 3, 4]])) as past:
+        assert past is None
+
+
+class FakeOllama:
+    """ollama module stand-in: clients echo host, prompt and options, and count generate() calls."""
+    def __init__(self, chunks=None, delays=None):
+        self.calls = []
+        self.chunks = chunks or []
+        self.delays = delays or {}
+        self.closed = []
+        outer = self
+
+        class Stream:
+            def __init__(self):
+                self.consumed = 0
+
+            def __iter__(self):
+                for text in outer.chunks:
+                    self.consumed += 1
+                    yield {'response': text}
+
+            def close(self):
+                outer.closed.append(self.consumed)
+
+        class Client:
+            def __init__(self, host):
+                self.host = host
+
+            def generate(self, model, prompt, options=None, stream=False):
+                outer.calls.append(('sync', self.host, prompt, options))
+                if stream:
+                    return Stream()
+                return {'response': f'{self.host}|{prompt}|{options}'}
+
+        class AsyncClient(Client):
+            async def generate(self, model, prompt, options=None):
+                outer.calls.append(('async', self.host, prompt, options))
+                await asyncio.sleep(outer.delays.get(prompt, 0))
+                return {'response': f'{self.host}|{prompt}|{options}'}
+
+        self.Client = Client
+        self.AsyncClient = AsyncClient
+
+
+@pytest.fixture
+def ollama_env(monkeypatch, tmp_path):
+    monkeypatch.setenv('LLM_PROMPT_CACHE', str(tmp_path / 'cache'))
+    monkeypatch.setitem(llm_prompt.CONFIG, 'default_ollama_server', 'http://a:11434')
+    monkeypatch.setattr(llm_prompt, '_CLIENT_CACHE', {})
+    fake = FakeOllama()
+    fake_optional(monkeypatch, ollama=fake)
+    return fake
+
+
+def test_cache_hits_only_for_same_sampling_and_server(ollama_env, monkeypatch):
+    def deliver(**kwargs):
+        return llm_prompt.Prompt('m', 'hi', enable_cache=True, **kwargs).deliver()
+
+    first = deliver(temperature=0.5)
+    assert deliver(temperature=0.5) == first
+    assert len(ollama_env.calls) == 1
+
+    deliver(temperature=0.7)
+    assert len(ollama_env.calls) == 2
+    # The default temperature isn't sent to ollama, so it must not share the explicit 0.3 entry
+    deliver()
+    deliver(temperature=0.3)
+    assert len(ollama_env.calls) == 4
+
+    monkeypatch.setitem(llm_prompt.CONFIG, 'default_ollama_server', 'http://b:11434')
+    assert deliver(temperature=0.5).startswith('http://b:11434|')
+    assert len(ollama_env.calls) == 5
+
+
+def test_stop_on_truncates_stream_and_closes_it(ollama_env):
+    ollama_env.chunks = ['ab', 'c STOP', 'never', 'read']
+    p = llm_prompt.Prompt('m', 'hi', stream=True, stop_on=lambda text: 'STOP' in text)
+    assert p.deliver() == 'abc STOP'
+    assert ollama_env.closed == [2]
+
+
+def test_deliver_batch_returns_results_in_input_order(ollama_env):
+    messages = ['slow', 'medium', 'fast']
+    ollama_env.delays = {'slow': 0.03, 'medium': 0.02, 'fast': 0.0}
+    prompts = [llm_prompt.Prompt('m', msg) for msg in messages]
+    results = asyncio.run(llm_prompt.Prompt.deliver_batch(prompts))
+    assert [r.split('|')[1] for r in results] == messages
+    assert {call[0] for call in ollama_env.calls} == {'async'}
+
+
+def test_deliver_batch_streams_through_sync_strategy_when_stop_on_set(ollama_env):
+    ollama_env.chunks = ['x', 'END', 'y']
+    prompts = [llm_prompt.Prompt('m', str(i), stream=True, stop_on=lambda text: text.endswith('END'))
+               for i in range(3)]
+    assert asyncio.run(llm_prompt.Prompt.deliver_batch(prompts)) == ['xEND'] * 3
+    assert {call[0] for call in ollama_env.calls} == {'sync'}
+
+
+def test_ollama_options_only_carry_explicit_settings():
+    assert llm_prompt.Prompt('m', 'hi')._ollama_options() is None
+    p = llm_prompt.Prompt('m', 'hi', temperature=0.0, max_new_tokens=5, seed=7)
+    assert p._ollama_options() == {'temperature': 0.0, 'num_predict': 5, 'seed': 7}
+
+
+def test_with_message_and_send(ollama_env):
+    p = llm_prompt.Prompt('m', 'first')
+    clone = p.with_message('second')
+    assert p.messageContent == 'first'
+    # The clone's bound strategy reads the clone's message
+    assert clone.deliver().split('|')[1] == 'second'
+    assert p.send('third').split('|')[1] == 'third'
+    assert p.messageContent == 'third'
+
+
+def test_litellm_text_accepts_objects_dicts_and_falls_back_to_str():
+    message = types.SimpleNamespace(content='obj')
+    obj = types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+    assert llm_prompt.Prompt._litellm_text(obj) == 'obj'
+    assert llm_prompt.Prompt._litellm_text({'choices': [{'message': {'content': 'dict'}}]}) == 'dict'
+    assert llm_prompt.Prompt._litellm_text({'choices': [{'message': {'content': None}}]}) == ''
+    assert llm_prompt.Prompt._litellm_text('raw') == 'raw'
+
+
+def test_left_pad_pads_on_the_left(monkeypatch):
+    fake_optional(monkeypatch, torch=types.SimpleNamespace(tensor=lambda rows: rows))
+    out = llm_prompt._left_pad([[5, 6, 7], [8]], pad_id=None)
+    assert out['input_ids'] == [[5, 6, 7], [0, 0, 8]]
+    assert out['attention_mask'] == [[1, 1, 1], [0, 0, 1]]
+    assert llm_prompt._left_pad([[1], [2, 3]], pad_id=9)['input_ids'] == [[9, 1], [2, 3]]
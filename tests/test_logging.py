@@ -109,3 +109,53 @@ def test_mummy_toggle_key_event_logging():
     # Expect a toggle_gates caused by white
     assert any(e.get('type') == 'toggle_gates' and e.get('by') == 'white' for e in ev)
 
+
+def test_replay_from_disk_after_run_evicted():
+    from app import RUNS  # type: ignore
+    board = minimal_board(2, 2)
+    fname = 'test_micro.json'
+    write_board_file(fname, board)
+
+    client = flask_app.test_client()
+    r = client.post('/api/run/start', json={'model': 'dummy', 'board': fname, 'micro': True})
+    rid = r.get_json()['run_id']
+    for _ in range(3):
+        client.post('/api/run/step', json={'run_id': rid, 'mode': 'human', 'action': 'WAIT'})
+    live = client.get(f'/api/run/replay?run_id={rid}').get_json()['log']
+
+    # Drop the in-memory run; replay must rebuild the log from the JSONL file
+    RUNS.pop(rid)
+    r = client.get(f'/api/run/replay?run_id={rid}')
+    assert r.status_code == 200
+    assert r.get_json()['log'] == live
+    assert [e['type'] for e in live[:2]] == ['system', 'state']
+
+
+def test_idle_run_log_fds_are_capped(monkeypatch):
+    import app as app_module  # type: ignore
+    monkeypatch.setattr(app_module, 'RUN_LOG_FDS_MAX', 2)
+    board = minimal_board(2, 2)
+    fname = 'test_micro.json'
+    write_board_file(fname, board)
+
+    client = flask_app.test_client()
+    rids = [client.post('/api/run/start', json={'model': 'dummy', 'board': fname}).get_json()['run_id']
+            for _ in range(4)]
+    for _ in range(2):
+        for rid in rids:
+            client.post('/api/run/step', json={'run_id': rid, 'mode': 'human', 'action': 'WAIT'})
+    assert len(app_module.RUN_LOG_FDS) <= 2
+
+    # Runs whose descriptor was closed while idle still have their complete log on disk
+    for rid in rids:
+        live = client.get(f'/api/run/replay?run_id={rid}').get_json()['log']
+        app_module.RUNS.pop(rid)
+        assert client.get(f'/api/run/replay?run_id={rid}').get_json()['log'] == live
+
+
+def test_parse_action_text_fallback_whole_words():
+    from app import parse_action_text  # type: ignore
+    assert parse_action_text("Action: left") == 'LEFT'
+    assert parse_action_text("I would move down, not up") == 'DOWN'
+    # Substrings inside other words are not actions
+    assert parse_action_text("Updating my plan") is None
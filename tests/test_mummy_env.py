@@ -6,7 +6,7 @@ import os, sys
 # Ensure repository root on path for direct module imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from mummy_env import Game
+from mummy_env import Game, StepResult
 
 
 def fresh_board(rows=2, cols=2):
@@ -275,3 +275,76 @@ def test_player_dies_on_trap_not_enemies():
     g2.step('WAIT')
     # White moved into trap at [0,2] then to [0,3] capturing player; trap had no effect on the mummy
     assert g2.done is True and g2.won is False
+
+
+def test_step_fast_matches_step():
+    from mummy_env import ACTIONS
+    b = fresh_board(rows=1, cols=6)
+    b["player"] = [0, 3]
+    b["white_mummies"] = [[0, 0]]
+    g1, g2 = Game(b), Game(b)
+    for name in ('LEFT', 'WAIT', 'UNDO', 'RIGHT', 'RESET', 'RIGHT'):
+        r1 = g1.step(name)
+        r2 = g2.step_fast(ACTIONS.index(name))
+        assert r1 == r2
+    assert g1.board == g2.board
+
+
+def test_batch_step_matches_step():
+    from mummy_env import ACTIONS
+    b = fresh_board(rows=1, cols=6)
+    b["player"] = [0, 3]
+    b["white_mummies"] = [[0, 0]]
+    g = Game(b)
+    start = g.snapshot()
+    ids = [ACTIONS.index(a) for a in ('LEFT', 'RIGHT', 'WAIT')]
+    out = g.batch_step([start] * len(ids), ids)
+    assert g.snapshot() == start and g.history == []
+    for (snap, done, won), action_id in zip(out, ids):
+        ref = Game(b)
+        res = ref.step_fast(action_id)
+        assert snap == ref.snapshot()
+        assert (done, won) == (res.done, res.won)
+
+
+def test_step_without_render():
+    b = fresh_board(2, 2)
+    g1, g2 = Game(b), Game(b)
+    r1 = g1.step('RIGHT')
+    r2 = g2.step('RIGHT', render=False)
+    assert r2.ascii == '' and r1.ascii
+    assert (r1.pos, r1.moved, r1.done) == (r2.pos, r2.moved, r2.done)
+    assert g2.step_micro('WAIT', render=False).ascii == ''
+
+
+def test_ascii_rendered_later_matches_step_time():
+    b = fresh_board(1, 3)
+    b["v_gates"][0][2] = True  # closed gate between (0,1) and (0,2)
+    b["keys"] = [[0, 1]]
+    g = Game(b)
+    r0 = g.step('WAIT')
+    text0 = Game(b).to_text()
+    g.step('RIGHT')  # onto the key: gates toggle open
+    assert ':' not in g.to_text()
+    assert r0.ascii == text0 and ':' in r0.ascii
+
+
+def test_lazy_ascii_keeps_dataclass_contract():
+    import dataclasses
+    b = fresh_board(2, 2)
+    r = Game(b).step('WAIT')
+    eager = StepResult(**{f.name: getattr(Game(b).step('WAIT'), f.name) for f in dataclasses.fields(StepResult)})
+    assert r == eager
+    assert dataclasses.asdict(r)['ascii'] == Game(b).to_text()
+    assert 'ascii=' in repr(r)
+
+
+def test_restore_rejects_gate_bits_that_disagree_with_toggles():
+    b = fresh_board(1, 3)
+    b["v_gates"][0][2] = True
+    g = Game(b)
+    snap = g.snapshot()
+    with pytest.raises(ValueError):
+        g.restore(snap[:6] + (snap[6] + 1,) + snap[7:])
+    g.restore(snap)
+    assert g.snapshot() == snap
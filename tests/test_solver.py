@@ -2,6 +2,7 @@ import unittest
 
 from mummy_maze.level import parse_level
 from mummy_maze.solver import solve
+from mummy_maze.state import STEP_BITS, is_blocked_with_edge_check
 
 
 class TestMummyMazeSolver(unittest.TestCase):
@@ -27,6 +28,21 @@ class TestMummyMazeSolver(unittest.TestCase):
         # Should at least move onto K, then G, then E
         self.assertGreaterEqual(len(plan), 3)
 
+    def test_blocked_masks_match_edge_check(self):
+        lvl = parse_level(
+            """
+            P|KG
+            -.+E
+            """
+        )
+        for gate_open in (False, True):
+            masks = lvl.blocked_masks(gate_open)
+            for y in range(lvl.height):
+                for x in range(lvl.width):
+                    for (dx, dy), bit in STEP_BITS.items():
+                        expected = is_blocked_with_edge_check(lvl, (x, y), (x + dx, y + dy), gate_open)
+                        self.assertEqual(bool(masks[y * lvl.width + x] & bit), expected)
+
 
 if __name__ == "__main__":
     unittest.main()